@@ -0,0 +1,63 @@
+"""
+Encode benchmarks: single-pass `form_encode` vs `variable_encode` + value conversion (two passes).
+
+    $ python benchmarks/bench_encode.py [rows]
+"""
+import sys
+import timeit
+import datetime
+import decimal
+
+from paqforms.helpers import variable_encode, form_encode
+
+
+def make_data(rows):
+    return {
+        'name': 'order',
+        'created': datetime.date(2014, 9, 10),
+        'rows': [
+            {
+                'title': 'row {}'.format(i),
+                'amount': i,
+                'price': decimal.Decimal(i) / 4,
+                'active': bool(i % 2),
+                'note': None,
+                'tags': ['a', 'b', 'c'],
+            }
+            for i in range(rows)
+        ],
+    }
+
+
+def two_pass_encode(data):
+    data = variable_encode(data)
+    for key, value in data.items():
+        if value is None:
+            data[key] = ''
+        elif value is False:
+            data[key] = '0'
+        elif value is True:
+            data[key] = '1'
+        elif hasattr(value, 'id'):
+            data[key] = value.id
+        else:
+            data[key] = str(value)
+    return data
+
+
+def bench(label, func, number):
+    seconds = min(timeit.repeat(func, number=number, repeat=3))
+    print('{:<28} {:>10.3f} ms/encode'.format(label, seconds / number * 1000))
+
+
+def main(rows=1000, number=20):
+    data = make_data(rows)
+    assert two_pass_encode(data) == form_encode(data)
+
+    print('{} rows, {} keys'.format(rows, len(form_encode(data))))
+    bench('variable_encode + convert', lambda: two_pass_encode(data), number)
+    bench('form_encode', lambda: form_encode(data), number)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
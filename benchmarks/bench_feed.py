@@ -0,0 +1,61 @@
+"""
+Feed benchmarks: form-encoded (string) data vs JSON data for the same form.
+
+    $ python benchmarks/bench_feed.py [rows]
+"""
+import sys
+import timeit
+import decimal
+
+from werkzeug.datastructures import MultiDict
+
+from paqforms import *
+
+
+class RowForm(BaseForm):
+    title = Field(None, converters=StrConverter())
+    amount = Field(None, converters=IntConverter())
+    price = Field(None, converters=FloatConverter())
+    total = Field(None, converters=DecimalConverter())
+    active = Field(None, converters=BoolConverter(none=False))
+
+
+class OrderForm(BaseForm):
+    name = Field(None, converters=StrConverter())
+    rows = FieldField(None, FormField(None, RowForm))
+
+
+def make_json(rows):
+    return {
+        'name': 'order',
+        'rows': [
+            {'title': 'row {}'.format(i), 'amount': i, 'price': i + 0.5, 'total': i * 2, 'active': bool(i % 2)}
+            for i in range(rows)
+        ],
+    }
+
+
+def make_multidict(rows):
+    return MultiDict(form_encode(make_json(rows)))
+
+
+def bench(label, func, number):
+    seconds = min(timeit.repeat(func, number=number, repeat=3))
+    print('{:<28} {:>10.3f} ms/feed'.format(label, seconds / number * 1000))
+
+
+def main(rows=200, number=20):
+    json_data = make_json(rows)
+    multidict = make_multidict(rows)
+    form = OrderForm({})
+
+    print('{} rows x {} fields'.format(rows, len(RowForm.prototypes)))
+    bench('variable_decode + feed', lambda: form.feed({}, variable_decode(multidict), submit=True), number)
+    bench('feed_flat', lambda: form.feed_flat({}, multidict, submit=True), number)
+    bench('feed (JSON as strings)', lambda: form.feed({}, json_data, submit=True), number)
+    bench('feed_json', lambda: form.feed_json({}, json_data, submit=True), number)
+    bench('feed_json + fingerprint', lambda: form.feed_json({}, json_data, submit=True).fingerprint, number)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
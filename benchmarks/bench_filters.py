@@ -0,0 +1,44 @@
+"""
+Filter form => pymongo query: compiling the form on every call vs the cached plan of `get_filters`.
+
+    $ python benchmarks/bench_filters.py [fields]
+"""
+import sys
+import timeit
+
+from paqforms import *
+from paqforms.pymongo import *
+from paqforms.pymongo.helpers import FilterTranslator
+
+
+def make_form(fields):
+    attrs = {}
+    data = {}
+    for i in range(fields):
+        if i % 3 == 0:
+            attrs['text{}'.format(i)] = FilterTextField('Text', meta={'text_index': 'prefix'})
+            data['text{}'.format(i)] = {'command': 'starts_with', 'starts_with': 'abc'}
+        elif i % 3 == 1:
+            attrs['int{}'.format(i)] = FilterIntField('Int')
+            data['int{}'.format(i)] = {'command': 'between', 'between': {'min': '1', 'max': '9'}}
+        else:
+            attrs['date{}'.format(i)] = FilterDateField('Date')
+            data['date{}'.format(i)] = {'command': 'equals', 'equals': '2020-01-02'}
+    SearchForm = type('SearchForm', (BaseForm,), attrs)
+    return SearchForm({}, data, submit=True)
+
+
+def bench(label, func, number):
+    seconds = min(timeit.repeat(func, number=number, repeat=3))
+    print('{:<28} {:>10.3f} us/query'.format(label, seconds / number * 1000000))
+
+
+def main(fields=30, number=2000):
+    form = make_form(fields)
+    print('{} filter fields'.format(fields))
+    bench('compile every call', lambda: FilterTranslator(form.prototypes)(form), number)
+    bench('get_filters (cached plan)', lambda: get_filters(form), number)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,48 @@
+"""
+Memory of fed forms: a huge `FieldField` editor (1000 rows by default), traced with `tracemalloc`.
+
+    $ python benchmarks/bench_memory.py [rows]
+"""
+import sys
+import gc
+import tracemalloc
+
+from paqforms import *
+
+
+class RowForm(BaseForm):
+    title = TextField('Title')
+    amount = Field(TextWidget('Amount'), converters=IntConverter())
+    kind = ChoiceField('Kind', choices=['a', 'b', 'c'])
+    tags = MultiChoiceField('Tags', choices=['x', 'y'])
+
+
+class EditorForm(BaseForm):
+    rows = FieldField('Rows', FormField('Row', RowForm))
+
+
+def count_fields(field):
+    subfields = field.fields.values() if isinstance(field.fields, dict) else field.fields
+    return 1 + sum(count_fields(subfield) if hasattr(subfield, 'fields') else 1 for subfield in subfields)
+
+
+def main(rows=1000):
+    data = {'rows': [{'title': 'row {}'.format(i), 'amount': str(i), 'kind': 'a', 'tags': ['x']} for i in range(rows)]}
+    form = EditorForm({})
+    gc.collect()
+    tracemalloc.start()
+    form.feed({}, data, submit=True)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    form.messages
+    messages_size = tracemalloc.get_traced_memory()[0] - size
+    tracemalloc.stop()
+    fields = count_fields(form)
+    print('{} rows, {} fields'.format(rows, fields))
+    print('{:<28} {:>10.1f} KiB'.format('fed form', size / 1024))
+    print('{:<28} {:>10.0f} B'.format('per field', size / fields))
+    print('{:<28} {:>10.1f} KiB'.format('form.messages (lazy)', messages_size / 1024))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,78 @@
+"""
+Render benchmarks on a wide form (500 fields by default).
+
+    $ python benchmarks/bench_render.py [fields]
+"""
+import sys
+import timeit
+
+from paqforms import *
+
+
+def make_form_class(fields):
+    prototypes = {}
+    for i in range(fields):
+        kind = i % 5
+        name = 'field{}'.format(i)
+        if kind == 0:
+            prototypes[name] = TextField('Text {}'.format(i))
+        elif kind == 1:
+            prototypes[name] = Field(PasswordWidget('Password {}'.format(i)), converters=StrConverter())
+        elif kind == 2:
+            prototypes[name] = CheckField('Check {}'.format(i))
+        elif kind == 3:
+            prototypes[name] = ChoiceField('Choice {}'.format(i), choices=['a', 'b', 'c'])
+        else:
+            prototypes[name] = Field(TextareaWidget('Textarea {}'.format(i)), converters=StrConverter())
+    return type('WideForm', (BaseForm,), prototypes)
+
+
+class RowForm(BaseForm):
+    title = TextField('Title')
+    kind = ChoiceField('Kind', choices=['a', 'b', 'c'])
+    tags = MultiChoiceField('Tags', choices=['x', 'y', 'z'])
+    author = FormField('Author', type('AuthorForm', (BaseForm,), {'name': TextField('Name')}))
+
+
+class EditorForm(BaseForm):
+    rows = FieldField('Rows', FormField('Row', RowForm))
+
+
+def legacy_attrs_str(attrs):
+    return ' '.join(
+        '{}="{}"'.format(key, attrs[key]) for key in sorted(attrs)
+        if not key.startswith('_') and attrs[key] is not False and attrs[key] is not None
+    )
+
+
+def bench(label, func, number):
+    seconds = min(timeit.repeat(func, number=number, repeat=3))
+    print('{:<32} {:>10.3f} ms'.format(label, seconds / number * 1000))
+
+
+def main(fields=500, number=5):
+    form = make_form_class(fields)({})
+    attrs = Attrs({'class': 'form-control input-small', 'id': 'field1', 'name': 'field1', 'type': 'text', 'value': 'x < y', 'required': False})
+    assert legacy_attrs_str(attrs) == str(attrs)
+
+    print('{} fields'.format(fields))
+    bench('str(Attrs) x {} (legacy)'.format(fields), lambda: [legacy_attrs_str(attrs) for _ in range(fields)], number)
+    bench('str(Attrs) x {}'.format(fields), lambda: [str(attrs) for _ in range(fields)], number)
+    bench('form render', lambda: form(), number)
+    python_form = make_form_class(fields)({}, meta={'renderer': 'python'})
+    bench('form render (python)', lambda: python_form(), number)
+    single_form = make_form_class(fields)({}, meta={'single_template': True})
+    bench('form render (single template)', lambda: single_form(), number)
+    form_class = make_form_class(fields)
+    bench('pristine feed + render', lambda: form_class(None)(), number)
+    form_class.meta = {'cache_pristine': True}
+    bench('pristine render (cached)', lambda: form_class.render_pristine(), number)
+    editor_form = EditorForm({})
+    bench('editor render (prototype cache)', lambda: editor_form(), number * 20)
+    FieldFieldWidget.cache_prototype = False
+    bench('editor render (no cache)', lambda: editor_form(), number * 20)
+    FieldFieldWidget.cache_prototype = None
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
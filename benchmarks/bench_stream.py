@@ -0,0 +1,56 @@
+"""
+Streaming vs full render of a huge `FieldField` editor (1000 rows by default).
+
+    $ python benchmarks/bench_stream.py [rows]
+"""
+import sys
+import time
+import tracemalloc
+
+from paqforms import *
+
+
+class RowForm(BaseForm):
+    title = TextField('Title')
+    amount = Field(TextWidget('Amount'), converters=IntConverter())
+    kind = ChoiceField('Kind', choices=['a', 'b', 'c'])
+
+
+class EditorForm(BaseForm):
+    rows = FieldField('Rows', FormField('Row', RowForm))
+
+
+def measure(label, func):
+    """`func` returns seconds to its first chunk"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    first = func()
+    total = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print('{:<8} first chunk {:>9.3f} ms, total {:>9.3f} ms, peak {:>9.1f} KiB'.format(label, first * 1000, total * 1000, peak / 1024))
+
+
+def main(rows=1000):
+    form = EditorForm({}, {'rows': [{'title': 'row {}'.format(i), 'amount': str(i), 'kind': 'a'} for i in range(rows)]}, submit=True)
+
+    def render():
+        start = time.perf_counter()
+        form()
+        return time.perf_counter() - start
+
+    def stream():
+        start = time.perf_counter()
+        first = None
+        for chunk in form.stream():
+            if first is None:
+                first = time.perf_counter() - start
+        return first
+
+    print('{} rows'.format(rows))
+    measure('render', render)
+    measure('stream', stream)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -1,5 +1,5 @@
 from .converters import *
-from .helpers import variable_decode, variable_encode, form_encode
+from .helpers import register_accessor, variable_decode, VariableView, variable_encode, register_value_encoder, form_encode
 from .html import Attrs, Attr
 from .validators import *
 from .fields import *
@@ -12,7 +12,8 @@ __all__ = (
     'ValidationError',
 
     # HELPERS
-    'Attrs', 'Attr', 'variable_decode', 'variable_encode', 'form_encode',
+    'Attrs', 'Attr', 'register_accessor',
+    'variable_decode', 'VariableView', 'variable_encode', 'register_value_encoder', 'form_encode',
 
     # CONVERTERS
     'StrConverter', 'BoolConverter', 'IntConverter', 'FloatConverter',
@@ -20,9 +21,10 @@ __all__ = (
     'SplitConverter', 'FilterConverter', 'FilterValueConverter', 'ListConverter', 'MapConverter',
 
     # VALIDATORS
+    'CHEAP', 'MODERATE', 'EXPENSIVE',
     'LengthValidator', 'ValueValidator', 'OneOfValidator',
     'RegexValidator', 'EmailValidator', 'URLValidator',
-    'RepeatValidator', 'CallbackValidator', 'MapValidator',
+    'RepeatValidator', 'CallbackValidator', 'MapValidator', 'CrossValidator',
 
     # FIELDS
     'Field', 'FieldField', 'FormField', 'BaseForm',
@@ -0,0 +1,232 @@
+"""
+Pure-python counterparts of the bootstrap widget templates.
+
+Each renderer repeats its template (and `macros.html`) step by step, with the same `Attrs`
+operations, so the markup is the same as Jinja gives (up to indentation).
+Selected by `Widget.renderer = 'python'` globally or `meta={'renderer': 'python'}` per form / field.
+"""
+import itertools
+
+from ..html import *
+
+
+# MACROS
+def form_group(field, widget, attrs, data_widget, caller):
+    attrs = Attrs.take_prefixed(attrs, 'group-')
+    attrs.update({'class': attrs['class'] + 'form-group'})
+    messages = field.messages
+    if messages.get('error'):
+        attrs.update({'class': attrs['class'] + 'has-error'})
+    elif messages.get('success'):
+        attrs.update({'class': attrs['class'] + 'has-success'})
+    elif messages.get('warning'):
+        attrs.update({'class': attrs['class'] + 'has-warning'})
+    elif messages.get('info'):
+        attrs.update({'class': attrs['class'] + 'has-info'})
+    if not widget.caption:
+        attrs.update({'class': attrs['class'] + 'nocaption'})
+    attrs.setdefault('data-name', field.fullname)
+    attrs.setdefault('data-widget', data_widget)
+    attrs.setdefault('id', 'group-' + str(field.fullname))
+    return '<div {}>\n{}\n</div>'.format(attrs, caller())
+
+
+def prepend_append(prepend, append, attrs, caller):
+    prepend_attrs = Attrs.take_prefixed(attrs, 'prepend-')
+    append_attrs = Attrs.take_prefixed(attrs, 'append-')
+    prepend_attrs.update({'class': prepend_attrs['class'] + 'input-group-addon'})
+    append_attrs.update({'class': append_attrs['class'] + 'input-group-addon'})
+    if prepend and append:
+        return '<div class="input-group input-group-prepend input-group-append">\n<span {}>{}</span>\n{}\n<span {}>{}</span>\n</div>'.format(
+            prepend_attrs, prepend, caller(), append_attrs, append
+        )
+    elif prepend:
+        return '<div class="input-group input-group-prepend">\n<span {}>{}</span>\n{}\n</div>'.format(
+            prepend_attrs, prepend, caller()
+        )
+    elif append:
+        return '<div class="input-group input-group-append">\n{}\n<span {}>{}</span>\n</div>'.format(
+            caller(), append_attrs, append
+        )
+    else:
+        return caller()
+
+
+def print_label(field, caption, description, tooltip, attrs, caller=None):
+    attrs = attrs.copy()
+    attrs.update({'class': str(attrs['class']) + ' control-label'})
+    attrs.update({'for': attrs['for'] or field.fullname})
+    attrs.update({'required': attrs['required'] if str(attrs['required']) else field.required()})
+    extra = ''
+    if description:
+        extra += '<span class="descr">{}</span>'.format(description)
+    if tooltip:
+        extra += '<a href="#" data-toggle="tooltip" title="{}"><i class="icon-tooltip fa fa-question-circle"></i></a>'.format(tooltip)
+    if caller:
+        return '<label {}>\n{} {}{}</label>'.format(attrs, caller(), caption or '&nbsp;', extra)
+    else:
+        return '<label {}>{}{}</label>'.format(attrs, caption or '&nbsp;', extra)
+
+
+def get_option(widget, field, value, option):
+    if option is None:
+        if widget.get_option:
+            option = widget.get_option(value)
+        else:
+            option = field.format_value(value)
+    return option
+
+
+# HELPERS
+def render_alerts_inline(field):
+    return '<div>\n{}\n</div>'.format('\n'.join(
+        '<small class="help-block">{}</small>'.format('. '.join(field.messages[key]))
+        for key in ['success', 'error', 'info', 'warning'] if field.messages.get(key)
+    ))
+
+
+# WIDGETS
+def render_input(widget, field, attrs, context):
+    description, tooltip = context.get('description'), context.get('tooltip')
+    prepend, append = context.get('prepend'), context.get('append')
+
+    def input():
+        attrs.setdefault('type', widget.type)
+        attrs.setdefault('name', field.fullname)
+        attrs.setdefault('id', field.fullname)
+        attrs.setdefault('value', field.format())
+        attrs.update({'class': attrs['class'] + 'form-control'})
+        return '<input {}/>'.format(attrs)
+
+    def group():
+        label = print_label(field, widget.caption, description, tooltip, Attrs(required=attrs['required']))
+        return '{}\n<div class="controls">\n{}\n</div>\n{}'.format(
+            label, prepend_append(prepend, append, attrs, input), field.alerts()
+        )
+
+    return form_group(field, widget, attrs, 'Input', group)
+
+
+def render_checkbox(widget, field, attrs, context):
+    description, tooltip = context.get('description'), context.get('tooltip')
+    prepend, append = context.get('prepend'), context.get('append')
+
+    def input():
+        attrs.update({'type': 'checkbox'})
+        attrs.setdefault('name', field.fullname)
+        attrs.setdefault('id', field.fullname)
+        attrs.setdefault('value', '1')
+        attrs.setdefault('checked', True if field.format() == '1' else False)
+        return '<input {}/>'.format(attrs)
+
+    def group():
+        label = print_label(
+            field, widget.caption, description, tooltip, Attrs({'class': 'checkbox', 'required': False}),
+            lambda: prepend_append(prepend, append, attrs, input)
+        )
+        return '<div class="controls">\n{}\n</div>\n{}'.format(label, field.alerts())
+
+    return form_group(field, widget, attrs, 'Checkbox', group)
+
+
+def render_select(widget, field, attrs, context):
+    description, tooltip = context.get('description'), context.get('tooltip')
+    prepend, append = context.get('prepend'), context.get('append')
+
+    def select():
+        attrs.update({'class': attrs['class'] + 'form-control'})
+        attrs.update({'multiple': widget.multiple})
+        attrs.update({'name': field.fullname})
+        attrs.update({'id': field.fullname})
+        options = []
+        for value, option in itertools.zip_longest(field.choices(), field.widget.options()):
+            option = get_option(widget, field, value, option)
+            optattrs = Attrs(value=field.format_value(value), selected=field.is_chosen(value))
+            if isinstance(option, tuple):
+                option, _optattrs = option
+                optattrs.update(_optattrs)
+            options.append('<option {}>{}</option>'.format(optattrs, option))
+        if not options and field.value is not None:
+            data = field.format_value(field.value)
+            options.append('<option value="{}" selected>{}</option>'.format(data, data))
+        return '<select {}>\n{}\n</select>'.format(attrs, '\n'.join(options))
+
+    def group():
+        label = print_label(field, widget.caption, description, tooltip, Attrs(required=attrs['required']))
+        return '{}\n<div class="controls">\n{}\n</div>\n{}'.format(
+            label, prepend_append(prepend, append, attrs, select), field.alerts()
+        )
+
+    return form_group(field, widget, attrs, 'Select', group)
+
+
+def render_textarea(widget, field, attrs, context):
+    description, tooltip = context.get('description'), context.get('tooltip')
+    prepend, append = context.get('prepend'), context.get('append')
+
+    def textarea():
+        attrs.update({'class': attrs['class'] + 'form-control'})
+        attrs.update({'name': field.fullname})
+        attrs.update({'id': field.fullname})
+        return '<textarea {}>{}</textarea>'.format(attrs, Attr(field.format()))
+
+    def group():
+        label = print_label(field, widget.caption, description, tooltip, Attrs(required=attrs['required']))
+        return '{}\n<div class="controls">\n{}\n</div>\n{}'.format(
+            label, prepend_append(prepend, append, attrs, textarea), field.alerts()
+        )
+
+    return form_group(field, widget, attrs, 'Textarea', group)
+
+
+def render_multicheckbox(widget, field, attrs, context):
+    description, tooltip = context.get('description'), context.get('tooltip')
+
+    def group():
+        label_attrs = Attrs({'class': 'checkbox', 'required': attrs['required']})
+        if widget.show_toggler:
+            legend = print_label(
+                field, widget.caption, description, tooltip, label_attrs,
+                lambda: '<input data-tag="toggler" id="{}" type="checkbox"/>'.format(field.fullname)
+            )
+        else:
+            legend = print_label(field, widget.caption, description, tooltip, label_attrs)
+        controls = []
+        for i, (value, option) in enumerate(itertools.zip_longest(field.choices(), field.widget.options())):
+            option = get_option(widget, field, value, option)
+            optattrs = Attrs(attrs,
+                type = 'checkbox',
+                value = field.format_value(value),
+                checked = field.is_chosen(value),
+                name = str(field.fullname) + '-' + str(i + 1),
+                id = str(field.fullname) + '-' + str(field.format_value(value)),
+            )
+            if isinstance(option, tuple):
+                option, _optattrs = option
+                optattrs.update(_optattrs)
+            label = print_label(
+                field, option, None, None, Attrs({'class': 'checkbox', 'for': optattrs['id'], 'required': False}),
+                lambda: '<input {}/>'.format(optattrs)
+            )
+            controls.append('<div class="controls">\n{}\n</div>'.format(label))
+        return '<fieldset>\n<legend>\n{}\n</legend>\n{}\n</fieldset>\n{}'.format(
+            legend, '\n'.join(controls), field.alerts()
+        )
+
+    return form_group(field, widget, attrs, 'MultiCheckbox', group)
+
+
+# Keyed by the template each renderer replaces
+renderers = {
+    'InputWidget.html': render_input,
+    'CheckboxWidget.html': render_checkbox,
+    'SelectWidget.html': render_select,
+    'TextareaWidget.html': render_textarea,
+    'MultiCheckboxWidget.html': render_multicheckbox,
+}
+
+
+__all__ = (
+    'renderers',
+    'render_alerts_inline',
+)
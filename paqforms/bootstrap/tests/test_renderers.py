@@ -0,0 +1,474 @@
+import re
+import asyncio
+
+from paqforms import *
+from paqforms.bootstrap import *
+from paqforms.bootstrap import widgets
+from paqforms.bootstrap.widgets import has_dynamic_callables
+
+
+def normalize(html):
+    """Drops indentation: whitespace runs collapse and whitespace between tags goes away"""
+    return re.sub(r'>\s+<', '><', re.sub(r'\s+', ' ', str(html))).strip()
+
+
+class EveryWidgetForm(BaseForm):
+    text = TextField(TextWidget('Text & more', attrs={'group-class': 'wide', 'class': 'input-small'}), required=True)
+    hidden = Field(HiddenWidget(''), converters=StrConverter())
+    password = Field(PasswordWidget('Password'), converters=StrConverter())
+    date = DateField(DateWidget('Date'))
+    check = CheckField(CheckboxWidget('Check'))
+    choice = ChoiceField('Choice', choices=['a', 'b', 'c'])
+    styled_choice = ChoiceField(
+        SelectWidget('Styled', options=['A', ('B', {'data-b': '<b>'}), None], get_option=lambda value: value.upper()),
+        choices = ['a', 'b', 'c'],
+    )
+    empty_choice = ChoiceField('Empty', default='x')
+    multiple = MultiChoiceField(SelectWidget('Multiple', multiple=True), choices=['a', 'b'])
+    checks = MultiChoiceField('Checks', choices=['x', 'y', 'z'])
+    untoggled = MultiChoiceField(MultiCheckboxWidget('Untoggled', options=['X', ('Y', {'disabled': True})], show_toggler=False), choices=['x', 'y'])
+    textarea = Field(TextareaWidget('Textarea'), converters=StrConverter())
+
+
+data = {
+    'text': '',
+    'hidden': 'h"idden',
+    'password': '<secret>',
+    'date': 'not a date',
+    'check': '1',
+    'choice': 'b',
+    'styled_choice': 'z',
+    'multiple': ['a', 'b'],
+    'checks': ['y'],
+    'untoggled': ['x'],
+    'textarea': 'line 1\nline <2>',
+}
+
+
+contexts = [
+    {},
+    {'description': 'Some description', 'tooltip': 'Some tooltip'},
+    {'prepend': '$'},
+    {'append': '.00'},
+    {'prepend': '$', 'append': '.00'},
+]
+
+
+attrs = [
+    {},
+    {'class': 'extra', 'required': False, 'prepend-class': 'pre', 'append-id': 'app'},
+    {'required': True, 'data-x': 'a&b'},
+]
+
+
+class Test_Equivalence:
+    def check(self, form):
+        for name, field in form.fields.items():
+            for attrs_ in attrs:
+                for context in contexts:
+                    Widget.renderer = 'jinja'
+                    expected = field(attrs_, **context)
+                    Widget.renderer = 'python'
+                    try:
+                        got = field(attrs_, **context)
+                    finally:
+                        Widget.renderer = 'jinja'
+                    assert normalize(got) == normalize(expected), (name, attrs_, context, normalize(got), normalize(expected))
+
+
+    def test_pristine(self):
+        self.check(EveryWidgetForm({}))
+
+
+    def test_submitted(self):
+        form = EveryWidgetForm({}, data, submit=True)
+        assert form.fields['text'].messages['error'] and form.fields['date'].messages['error']
+        self.check(form)
+
+
+    def test_nested(self):
+        class NestedForm(BaseForm):
+            inner = FormField('Inner', EveryWidgetForm)
+        form = NestedForm({}, {'inner': data}, submit=True)
+        self.check(form.fields['inner'])
+
+
+class Test_Selection:
+    def test_default(self):
+        form = EveryWidgetForm({})
+        assert Widget.renderer == 'jinja'
+        assert form.fields['text'].widget.get_renderer(form.fields['text']) is None
+
+
+    def test_meta(self):
+        class PythonForm(EveryWidgetForm):
+            meta = {'renderer': 'python'}
+        form = PythonForm({})
+        assert form.renderer == 'python'
+        assert form.fields['text'].widget.get_renderer(form.fields['text'])
+        form2 = EveryWidgetForm({}, meta={'renderer': 'python'})
+        assert form2.fields['checks'].renderer == 'python'
+        assert normalize(form()) == normalize(EveryWidgetForm({})())
+
+
+    def test_fallback(self):
+        form = EveryWidgetForm({}, meta={'renderer': 'python'})
+        custom = TextWidget('Custom', template='FilterTextWidget.html')
+        assert custom.get_renderer(form.fields['text']) is None
+        field = Field(FilterTextWidget('Filter'), name='filter').bind(form)
+        assert field.widget.get_renderer(field) is None
+
+
+class RowForm(BaseForm):
+    title = TextField('Title')
+    kind = ChoiceField('Kind', choices=['x', 'y'])
+
+
+class NestedForm(EveryWidgetForm):
+    rows = FieldField('Rows', FormField('Row', RowForm))
+    tags = FieldField('Tags', TextField('Tag'))
+    author = FormField('Author', RowForm)
+    period = BetweenIntField('Period')
+
+
+class Test_SingleTemplate:
+    def check(self, form, attrs={}, **context):
+        expected = form(attrs, **context)
+        form.meta['single_template'] = True
+        try:
+            got = form(attrs, **context)
+        finally:
+            del form.meta['single_template']
+        assert normalize(got) == normalize(expected), (normalize(got), normalize(expected))
+
+
+    def test_pristine(self):
+        self.check(NestedForm({}))
+
+
+    def test_submitted(self):
+        nested_data = dict(data,
+            rows = [{'title': 'first', 'kind': 'x'}, {'title': 'second', 'kind': 'z'}],
+            tags = ['a', 'b'],
+            author = {'title': 'author'},
+            period = {'min': '1', 'max': 'x'},
+        )
+        form = NestedForm({}, nested_data, submit=True)
+        self.check(form)
+        self.check(form, {'class': 'extra', 'author-title-class': 'author-title'}, description='Context description')
+
+
+    def test_python_renderer(self):
+        self.check(NestedForm({}, meta={'renderer': 'python'}))
+
+
+    def test_meta(self):
+        class SingleForm(NestedForm):
+            meta = {'single_template': True}
+        assert normalize(SingleForm({})()) == normalize(NestedForm({})())
+
+
+class Test_Stream:
+    def test_stream(self):
+        form = NestedForm({}, {'rows': [{'title': 'first'}, {'title': 'second'}]}, submit=True)
+        chunks = form.stream({'class': 'extra'})
+        assert not isinstance(chunks, str)
+        chunks = list(chunks)
+        assert len(chunks) > len(form.fields)
+        assert ''.join(chunks) == form({'class': 'extra'})
+
+
+    def test_chunk_size(self):
+        form = NestedForm({}, {'rows': [{'title': str(i)} for i in range(300)]}, submit=True)
+        for chunks in [list(form.fields['rows'].stream()), list(form.stream())]:
+            assert sum(map(len, chunks)) > 300 * 1024
+            assert max(map(len, chunks)) < 4096 # Row by row, not the whole FieldField at once
+
+
+    def test_field(self):
+        form = NestedForm({}, {'rows': [{'title': 'first'}]}, submit=True)
+        rows = form.fields['rows']
+        assert ''.join(rows.stream(description='Rows')) == rows(description='Rows')
+        assert ''.join(form.fields['text'].stream()) == form.fields['text']()
+
+
+    def test_single_template(self):
+        form = NestedForm({}, meta={'single_template': True})
+        assert ''.join(form.stream()) == form()
+
+
+    def test_python_renderer(self):
+        form = NestedForm({}, meta={'renderer': 'python'})
+        assert ''.join(form.stream()) == form()
+
+
+async def async_choices():
+    await asyncio.sleep(0)
+    return ['a', 'b', 'c']
+
+
+async def async_options():
+    await asyncio.sleep(0)
+    return ['A', ('B', {'data-b': '1'})]
+
+
+async def async_get_option(value):
+    await asyncio.sleep(0)
+    return value.upper()
+
+
+class AsyncRowForm(BaseForm):
+    kind = ChoiceField(SelectWidget('Kind', options=async_options), choices=async_choices)
+
+
+class AsyncForm(BaseForm):
+    text = TextField('Text')
+    choice = ChoiceField(SelectWidget('Choice', get_option=async_get_option), choices=async_choices)
+    checks = MultiChoiceField(MultiCheckboxWidget('Checks', options=async_options), choices=async_choices)
+    row = FormField('Row', AsyncRowForm)
+    rows = FieldField('Rows', FormField('Row', AsyncRowForm))
+
+
+class SyncRowForm(BaseForm):
+    kind = ChoiceField(SelectWidget('Kind', options=['A', ('B', {'data-b': '1'})]), choices=['a', 'b', 'c'])
+
+
+class SyncForm(BaseForm):
+    text = TextField('Text')
+    choice = ChoiceField(SelectWidget('Choice', get_option=lambda value: value.upper()), choices=['a', 'b', 'c'])
+    checks = MultiChoiceField(MultiCheckboxWidget('Checks', options=['A', ('B', {'data-b': '1'})]), choices=['a', 'b', 'c'])
+    row = FormField('Row', SyncRowForm)
+    rows = FieldField('Rows', FormField('Row', SyncRowForm))
+
+
+class Test_RenderAsync:
+    def __init__(self):
+        self.model = {'text': 'text', 'choice': 'b', 'checks': ['a', 'c'], 'row': {'kind': 'c'}, 'rows': [{'kind': 'a'}, {'kind': 'b'}]}
+
+
+    def test_render_async(self):
+        form = AsyncForm(self.model)
+        html = asyncio.run(form.render_async({'class': 'extra'}, description='Description'))
+        assert normalize(html) == normalize(SyncForm(self.model)({'class': 'extra'}, description='Description'))
+        assert 'coroutine' not in html
+
+
+    def test_field(self):
+        form = AsyncForm(self.model)
+        html = asyncio.run(form.fields['choice'].render_async())
+        sync_form = SyncForm(self.model)
+        assert normalize(html) == normalize(sync_form.fields['choice']())
+
+
+    def test_single_template(self):
+        form = AsyncForm(self.model, meta={'single_template': True})
+        html = asyncio.run(form.render_async())
+        assert normalize(html) == normalize(SyncForm(self.model)())
+
+
+    def test_sync_after_async(self):
+        form = SyncForm(self.model)
+        asyncio.run(form.render_async())
+        assert isinstance(form(), str)
+
+
+class CountingWidget(FieldFieldWidget):
+    made = 0
+
+
+    def make_prototype(self, field):
+        CountingWidget.made += 1
+        return FieldFieldWidget.make_prototype(self, field)
+
+
+kinds = ['x', 'y']
+labels = ['Apple', 'Pear']
+
+
+class CachedForm(BaseForm):
+    rows = FieldField(CountingWidget('Rows', cache_prototype=True), FormField('Row', RowForm))
+    dynamic = FieldField(CountingWidget('Dynamic', cache_prototype=True), ChoiceField('Kind', choices=lambda: kinds))
+    options = FieldField(CountingWidget('Options', cache_prototype=True), ChoiceField(SelectWidget('Kind', options=lambda: labels), choices=['x', 'y']))
+    forced = FieldField(CountingWidget('Forced', cache_prototype='always'), ChoiceField('Kind', choices=lambda: kinds))
+    plain = FieldField(CountingWidget('Plain'), FormField('Row', RowForm))
+
+
+class Test_PrototypeCache:
+    def setup(self):
+        FieldFieldWidget.invalidate()
+        CountingWidget.made = 0
+
+
+    def test_cache(self):
+        form = CachedForm({}, {'rows': [{'title': 'first'}]}, submit=True)
+        rows = form.fields['rows']
+        html = rows()
+        assert CountingWidget.made == 1
+        assert rows() == html and CountingWidget.made == 1
+        CachedForm({})()
+        CachedForm({})()
+        assert CountingWidget.made == 8 # `dynamic`, `options` and `plain` are rendered anew, `forced` once
+        rows.widget.cache_prototype = False
+        try:
+            assert rows() == html and CountingWidget.made == 9
+        finally:
+            del rows.widget.cache_prototype
+        rows({'data-x': '1'})
+        assert CountingWidget.made == 10
+
+
+    def test_nested_reassignment(self):
+        class InnerForm(BaseForm):
+            title = TextField('Title')
+        class OuterForm(BaseForm):
+            rows = FieldField(CountingWidget('Rows', cache_prototype=True), FieldField('Items', FormField('Item', InnerForm)))
+        form = OuterForm({})
+        assert 'Title' in form.fields['rows']()
+        InnerForm.title = TextField('Renamed')
+        form = OuterForm({})
+        html = form.fields['rows']()
+        assert 'Renamed' in html and 'Title' not in html
+
+
+    def test_key(self):
+        form, ru_form = CachedForm({}), CachedForm({}, locale='ru')
+        form.fields['rows']()
+        ru_form.fields['rows']()
+        assert CountingWidget.made == 2
+        CachedForm({}, meta={'single_template': True})()
+        assert CountingWidget.made == 7 # Each row through `form.html`
+
+
+    def test_choices_providers(self):
+        global kinds
+        form = CachedForm({})
+        dynamic, forced = form.fields['dynamic'], form.fields['forced']
+        assert 'value="y"' in dynamic() and 'value="y"' in forced()
+        kinds = ['z']
+        try:
+            assert 'value="z"' in dynamic()
+            assert 'value="y"' in forced()
+            FieldFieldWidget.invalidate(CachedForm)
+            assert 'value="z"' in forced()
+        finally:
+            kinds = ['x', 'y']
+
+
+    def test_dynamic_callables(self):
+        global labels
+        form = CachedForm({})
+        assert 'Apple' in form.fields['options']()
+        labels = ['Orange', 'Pear']
+        try:
+            assert 'Orange' in form.fields['options']()
+        finally:
+            labels = ['Apple', 'Pear']
+        assert has_dynamic_callables(CachedForm.prototypes['options'].prototype)
+        assert not has_dynamic_callables(RowForm) and not has_dynamic_callables(CachedForm.prototypes['rows'].prototype)
+
+
+    def test_opt_in(self):
+        form = CachedForm({})
+        form.fields['plain']()
+        form.fields['plain']()
+        assert CountingWidget.made == 2
+
+
+    def test_async(self):
+        form = CachedForm({})
+        html = asyncio.run(form.fields['rows'].render_async())
+        assert normalize(html) == normalize(form.fields['rows']())
+        assert 'coroutine' not in html
+
+
+class PristineForm(RowForm):
+    meta = {'cache_pristine': True}
+
+
+class Test_PristineCache:
+    def setup(self):
+        FormWidget.invalidate()
+
+
+    def test_cache(self):
+        form = PristineForm(None)
+        assert form.pristine
+        html = form({'class': 'extra'})
+        assert html == RowForm(None)({'class': 'extra'})
+        form.fields['title'].widget.caption = 'Changed'
+        try:
+            assert form({'class': 'extra'}) is html
+            assert form() != html
+            assert ''.join(form.stream({'class': 'extra'})) == html
+        finally:
+            form.fields['title'].widget.caption = 'Title'
+
+
+    def test_not_pristine(self):
+        for form in [PristineForm({'title': 'x'}), PristineForm(None, {'title': 'x'}), PristineForm(None, submit=True), PristineForm(None, default={'title': 'x'})]:
+            assert not form.pristine
+            form()
+        assert RowForm(None).pristine
+        RowForm(None)()
+        assert not len(widgets.pristine_cache)
+
+
+    def test_messages(self):
+        form = PristineForm(None)
+        html = form()
+        form.messages = {'warning': ['Check the title']}
+        assert not form.pristine and form.widget.get_pristine_key(form, {}, {}) is None
+        form = PristineForm(None)
+        form.fields['title'].messages = {'error': ['Taken']}
+        assert not form.pristine and 'Taken' in form() and form() != html
+
+
+    def test_nested_reassignment(self):
+        class InnerForm(BaseForm):
+            title = TextField('Title')
+        class OuterForm(BaseForm):
+            meta = {'cache_pristine': True}
+            inner = FormField('Inner', InnerForm)
+        assert 'Title' in OuterForm.render_pristine()
+        InnerForm.title = TextField('Renamed')
+        html = OuterForm.render_pristine()
+        assert 'Renamed' in html and 'Title' not in html
+
+
+    def test_render_pristine(self):
+        html = PristineForm.render_pristine(locale='ru', description='Descr')
+        assert html == PristineForm(None, locale='ru')(description='Descr')
+        assert len(widgets.pristine_cache) == 1
+        assert PristineForm.render_pristine(locale='ru', description='Descr') is html
+        assert PristineForm.render_pristine() != html
+        assert RowForm.render_pristine() == PristineForm.render_pristine()
+
+
+    def test_dynamic_callables(self):
+        global kinds
+        class KindForm(BaseForm):
+            meta = {'cache_pristine': True}
+            kind = ChoiceField('Kind', choices=lambda: kinds)
+        class ForcedForm(KindForm):
+            meta = {'cache_pristine': 'always'}
+        form, forced = KindForm(None), ForcedForm(None)
+        assert form.widget.get_pristine_key(form, {}, {}) is None
+        assert forced.widget.get_pristine_key(forced, {}, {}) is not None
+        assert 'value="y"' in form() and 'value="y"' in forced()
+        kinds = ['z']
+        try:
+            assert 'value="z"' in form() and 'value="z"' in KindForm.render_pristine()
+            assert 'value="y"' in forced()
+        finally:
+            kinds = ['x', 'y']
+
+
+    def test_invalidate(self):
+        class ChangingForm(PristineForm):
+            pass
+        html = ChangingForm.render_pristine()
+        ChangingForm.title = TextField('Other title')
+        assert ChangingForm.render_pristine() != html
+        PristineForm.render_pristine()
+        FormWidget.invalidate(ChangingForm)
+        assert len(widgets.pristine_cache) == 1
@@ -1,17 +1,99 @@
 import os.path as op; __dir__ = op.dirname(op.abspath(__file__))
 import itertools
+import contextvars
+import threading
 import html
 import jinja2
 
+from collections import OrderedDict
 from markupsafe import Markup
 
 from ..html import *
+from ..helpers import Constant
+from ..i18n import get_translations
+from .renderers import renderers, render_alerts_inline
+
+
+template_names = {} # Widget class -> name of the stock template it renders with
+rendering_async = contextvars.ContextVar('rendering_async', default=False) # Nested widget calls return awaitables
+template_envs = {} # (template dirs, enable_async) -> jinja environment shared by widgets, templates compile once
+
+
+def get_template_env(template_dirs, enable_async=False):
+    key = (tuple(template_dirs), enable_async)
+    if key not in template_envs:
+        template_loader = jinja2.FileSystemLoader(template_dirs)
+        template_envs[key] = jinja2.Environment(loader=template_loader, extensions=['jinja2.ext.do'], enable_async=enable_async)
+    return template_envs[key]
+
+
+class FragmentCache:
+    """Bounded (LRU) cache of rendered HTML, keyed by tuples starting with the form class"""
+    def __init__(self, size):
+        self.size = size
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+
+    def __len__(self):
+        return len(self.items)
+
+
+    def get(self, key):
+        with self.lock:
+            html = self.items.get(key)
+            if html is not None:
+                self.items.move_to_end(key)
+            return html
+
+
+    def set(self, key, html):
+        with self.lock:
+            self.items[key] = html
+            while len(self.items) > self.size:
+                self.items.popitem(last=False)
+        return html
+
+
+    def invalidate(self, form_class=None):
+        """Drops cached fragments (of `form_class`, its subclasses and forms embedding it only, if given)"""
+        with self.lock:
+            if form_class is None:
+                self.items.clear()
+            else:
+                for key in [key for key in self.items if issubclass(key[0], form_class) or embeds(key[0], form_class)]:
+                    del self.items[key]
+
+
+def embeds(form_class, other):
+    """Whether `FormField`s of `form_class` (at any depth) share the prototypes of `other` form class"""
+    stack, seen = list(form_class.prototypes.values()), set()
+    while stack:
+        prototype = stack.pop()
+        if hasattr(prototype, 'prototypes'):
+            if prototype.prototypes is other.prototypes:
+                return True
+            if id(prototype.prototypes) not in seen:
+                seen.add(id(prototype.prototypes))
+                stack.extend(prototype.prototypes.values())
+        elif hasattr(prototype, 'prototype'):
+            stack.append(prototype.prototype)
+    return False
+
+
+def attrs_key(attrs):
+    return tuple(sorted((key, value if value is None or isinstance(value, (bool, str)) else str(value)) for key, value in dict.items(attrs)))
+
+
+prototype_cache = FragmentCache(256) # (form class, field path, locale, ...) -> rendered prototype row, see `FieldFieldWidget`
+pristine_cache = FragmentCache(128) # (form class, name, locale, ...) -> rendered pristine form, see `FormWidget`
 
 
 class Widget:
     template = None # Can be overriden # HACK - nearly unused...
     alerts_template = 'alerts-inline.html'
     template_dirs = [op.join(__dir__, 'templates')]
+    renderer = 'jinja' # Set to 'python' to render stock templates with `renderers` (per form: `meta={'renderer': 'python'}`)
 
 
     def __init__(self, caption, attrs={}, template=None, template_dirs=[], **context):
@@ -20,18 +102,88 @@ class Widget:
         self.context = context
         self.template = template or self.template
         self.template_dirs = template_dirs or self.template_dirs
-        template_loader = jinja2.FileSystemLoader(self.template_dirs)
-        self.template_env = jinja2.Environment(loader=template_loader, extensions=['jinja2.ext.do'])
+        self.template_env = get_template_env(self.template_dirs)
 
 
     def __call__(self, field, attrs={}, **context):
+        if rendering_async.get():
+            return self.render_async(field, attrs, **context)
+        return Markup(''.join(self.stream(field, attrs, **context)))
+
+
+    def render_field(self, field, attrs):
+        """Renders a subfield (prototype, row) with its own widget"""
+        return field(attrs=attrs)
+
+
+    def stream(self, field, attrs={}, **context):
+        """Yields rendered HTML in chunks (`Template.generate`) for streaming responses"""
+        attrs, context = self.get_context(field, attrs, context)
+
+        renderer = self.get_renderer(field)
+        if renderer:
+            yield renderer(context['widget'], context['field'], attrs, context)
+            return
+
+        self.update_context(field, context)
+        yield from self.get_template().generate(
+            attrs = attrs,
+            context = context,
+            **context
+        )
+
+
+    async def render_async(self, field, attrs={}, **context):
+        """
+        Like `__call__`, but awaits async `choices`, `options` and `get_option` (`enable_async` environment).
+        Nested fields render asynchronously as well. Python renderers are not used.
+        """
+        attrs, context = self.get_context(field, attrs, context)
+        self.update_context(field, context)
+        token = rendering_async.set(True)
+        try:
+            return Markup(await self.get_template(self.async_template_env).render_async(
+                attrs = attrs,
+                context = context,
+                **context
+            ))
+        finally:
+            rendering_async.reset(token)
+
+
+    @property
+    def async_template_env(self):
+        return get_template_env(self.template_dirs, enable_async=True)
+
+
+    def get_context(self, field, attrs, context):
         attrs = Attrs(self.attrs, attrs)
 
         # MAIN
         context = dict(self.context, **context)
         context.setdefault('field', field)
         context.setdefault('widget', self)
+        return self.prepare(field, attrs, context), context
+
+
+    def prepare(self, field, attrs, context):
+        """Hook to extend `attrs` and `context` before rendering, returns `attrs`"""
+        return attrs
 
+
+    def get_template(self, template_env=None):
+        template_env = template_env or self.template_env
+        if self.template:
+            return template_env.get_template('widgets/' + self.template)
+        else:
+            filenames = ['widgets/{}.html'.format(cls.__name__) for cls in self.__class__.mro()[:-2]]
+            if filenames:
+                return template_env.select_template(filenames)
+            else:
+                raise Exception('Cannot render `Widget` class. Extend it or define `template` to use!')
+
+
+    def update_context(self, field, context):
         # PYTHON COMMONS
         context['str'] = str
         context['any'] = any
@@ -43,23 +195,26 @@ class Widget:
         context['_'] = field.translations.gettext
         context['Attr'] = Attr
         context['Attrs'] = Attrs
+        return context
 
+
+    def get_template_name(self):
+        """Name of the stock template the widget renders with, `None` for custom `template_dirs`"""
+        if self.template_dirs != Widget.template_dirs:
+            return None
         if self.template:
-            template = self.template_env.get_template('widgets/' + self.template)
-        else:
-            filenames = ['widgets/{}.html'.format(cls.__name__) for cls in self.__class__.mro()[:-2]]
-            if filenames:
-                template = self.template_env.select_template(filenames)
-            else:
-                raise Exception('Cannot render `Widget` class. Extend it or define `template` to use!')
+            return self.template
+        cls = self.__class__
+        if cls not in template_names:
+            filenames = [c.__name__ + '.html' for c in cls.mro()[:-2]]
+            template_names[cls] = next((f for f in filenames if op.exists(op.join(__dir__, 'templates', 'widgets', f))), None)
+        return template_names[cls]
 
-        return Markup(
-            template.render(
-                attrs = attrs,
-                context = context,
-                **context
-            )
-        )
+
+    def get_renderer(self, field):
+        """Pure-python renderer standing for the template, if `python` renderer is selected and the template is stock"""
+        if (getattr(field, 'renderer', None) or self.renderer) == 'python':
+            return renderers.get(self.get_template_name())
 
 
     def debug_repr(self):
@@ -68,6 +223,8 @@ class Widget:
 
     def alerts(self, field):
         if any(field.messages.values()):
+            if self.alerts_template == 'alerts-inline.html' and self.get_renderer(field):
+                return Markup(render_alerts_inline(field))
             template = self.template_env.get_template(op.join('helpers', self.alerts_template))
             return Markup(
                 template.render(field=field, __=field.translations.gettext)
@@ -77,13 +234,95 @@ class Widget:
 
 
 class FieldFieldWidget(Widget):
-    def __call__(self, field, attrs={}, **context):
-        attrs = Attrs(self.attrs, attrs)
+    """
+    Opt-in: rendered prototype rows are cached per (form class, field path, locale, attrs).
+    `cache_prototype`: False never caches, True caches rows without dynamic callables
+    (see `has_dynamic_callables`), 'always' caches every row (call `invalidate` when they change).
+    """
+    cache_prototype = False
+
+
+    def __init__(self, caption, cache_prototype=None, attrs={}, template=None, template_dirs=[], **context):
+        Widget.__init__(self, caption, attrs, template, template_dirs, **context)
+        if cache_prototype is not None:
+            self.cache_prototype = cache_prototype
+
+
+    def prepare(self, field, attrs, context):
+        if self.get_template_name() != 'FieldFieldWidget.html':
+            context['prototype'] = self.make_prototype(field) # Custom templates render it themselves
+        return attrs
+
+
+    def make_prototype(self, field):
+        """Empty row the client clones on "add" """
         prototype = field.prototype.clone()
         prototype.name = field.name + '-0'
         prototype.bind(field.master(), 0).feed(None)
-        context['prototype'] = prototype
-        return Widget.__call__(self, field, attrs, **context)
+        return prototype
+
+
+    def render_prototype(self, field, attrs, render=None):
+        """Prototype row HTML. `render(prototype, attrs)` is given by `form.html`"""
+        if rendering_async.get():
+            return (render or self.render_field)(self.make_prototype(field), attrs)
+        key = self.get_prototype_key(field, attrs, render)
+        if key is None:
+            return (render or self.render_field)(self.make_prototype(field), attrs)
+        html = prototype_cache.get(key)
+        if html is None:
+            html = prototype_cache.set(key, Markup((render or self.render_field)(self.make_prototype(field), attrs)))
+        return html
+
+
+    def get_prototype_key(self, field, attrs, render=None):
+        """Cache key of the prototype row, `None` if it must be rendered anew"""
+        if not self.cache_prototype or (self.cache_prototype != 'always' and has_dynamic_callables(field.prototype)):
+            return None
+        form = field
+        while form.master:
+            form = form.master()
+        return (
+            form.__class__,
+            self,
+            field.fullname,
+            str(field.locale),
+            field.translations,
+            getattr(field, 'renderer', None) or self.renderer,
+            render is not None,
+            attrs_key(attrs),
+        )
+
+
+    @staticmethod
+    def invalidate(form_class=None):
+        """Drops cached prototype rows (of `form_class` only, if given)"""
+        prototype_cache.invalidate(form_class)
+
+
+def has_dynamic_callables(prototype):
+    """
+    Whether rendering the prototype (or form class) calls user callables: `choices`, `required`,
+    widget `options` and `get_option`. Its HTML may change between requests then
+    """
+    if getattr(prototype, 'choices_provider', None):
+        return True
+    required = prototype.__dict__.get('required')
+    if required is not None and not isinstance(required, Constant):
+        return True
+    widget = getattr(prototype, 'widget', None)
+    if widget is not None:
+        options = widget.__dict__.get('options')
+        if options is not None and not isinstance(options, Constant):
+            return True
+        get_option = widget.__dict__.get('get_option')
+        if get_option is not None and not isinstance(get_option, ModelAttr):
+            return True
+    if hasattr(prototype, 'prototypes'):
+        return any(has_dynamic_callables(subprototype) for subprototype in prototype.prototypes.values())
+    if hasattr(prototype, 'prototype'):
+        return has_dynamic_callables(prototype.prototype)
+    return False
 
 
 class FieldsetWidget(Widget):
@@ -107,12 +346,110 @@ class FormFieldWidget(Widget):
 
 
 class FormWidget(Widget):
+    """
+    Opt-in (`cache_pristine = True` or `meta={'cache_pristine': True}`): HTML of pristine forms
+    (no model, data, default or submit) is cached per (form class, name, locale, renderer, attrs, context),
+    unless they have dynamic callables (see `has_dynamic_callables`); 'always' caches those too.
+    Call `invalidate` when templates or `choices` change, reassigning prototypes does it for the class.
+    """
     alerts_template = 'alerts-block.html'
+    single_template = False # Set to True to render whole forms with `form.html` (per form: `meta={'single_template': True}`)
+    cache_pristine = False
 
 
     def __call__(self, form, attrs={}, **context):
+        if rendering_async.get():
+            return self.render_async(form, attrs, **context)
+        key = self.get_pristine_key(form, attrs, context)
+        if key is None:
+            return Markup(''.join(self.render_stream(form, attrs, **context)))
+        html = pristine_cache.get(key)
+        if html is None:
+            html = pristine_cache.set(key, Markup(''.join(self.render_stream(form, attrs, **context))))
+        return html
+
+
+    def stream(self, form, attrs={}, **context):
+        key = self.get_pristine_key(form, attrs, context)
+        html = pristine_cache.get(key) if key else None
+        if html is None:
+            yield from self.render_stream(form, attrs, **context)
+        else:
+            yield html
+
+
+    def render_stream(self, form, attrs={}, **context):
         attrs = Attrs(self.attrs, attrs)
-        return Markup('\n'.join(field(attrs=attrs, **context) for field in form.fields.values() if getattr(field, 'autorender', True)))
+        if form.meta.get('single_template', self.single_template):
+            context = self.get_form_context(form, context)
+            yield from self.template_env.get_template('form.html').generate(form=form, attrs=attrs, **context)
+        else:
+            for i, field in enumerate(self.get_fields(form)):
+                if i:
+                    yield '\n'
+                yield from field.stream(attrs=attrs, **context)
+
+
+    async def render_async(self, form, attrs={}, **context):
+        attrs = Attrs(self.attrs, attrs)
+        token = rendering_async.set(True)
+        try:
+            if form.meta.get('single_template', self.single_template):
+                context = self.get_form_context(form, context)
+                return Markup(await self.async_template_env.get_template('form.html').render_async(form=form, attrs=attrs, **context))
+            else:
+                return Markup('\n'.join([await field.render_async(attrs=attrs, **context) for field in self.get_fields(form)]))
+        finally:
+            rendering_async.reset(token)
+
+
+    def get_pristine_key(self, form, attrs, context):
+        """Cache key of the form HTML, `None` if it must be rendered anew"""
+        cache_pristine = form.meta.get('cache_pristine', self.cache_pristine)
+        if not cache_pristine or not getattr(form, 'pristine', False):
+            return None
+        if cache_pristine != 'always' and has_dynamic_callables(form):
+            return None
+        if form.translations is not get_translations(form.locale): # Custom translations
+            return None
+        return self.make_pristine_key(
+            form.__class__, form.fullname, form.locale, form.renderer or self.renderer,
+            form.meta.get('single_template', self.single_template), attrs, context
+        )
+
+
+    @staticmethod
+    def make_pristine_key(form_class, name, locale, renderer, single_template, attrs, context):
+        key = (form_class, name, str(locale), renderer, bool(single_template), attrs_key(attrs), tuple(sorted(context.items())))
+        try:
+            hash(key)
+        except TypeError: # Unhashable context values
+            return None
+        return key
+
+
+    @staticmethod
+    def invalidate(form_class=None):
+        """Drops cached pristine forms (of `form_class` only, if given)"""
+        pristine_cache.invalidate(form_class)
+
+
+    def get_fields(self, form):
+        return [field for field in form.fields.values() if getattr(field, 'autorender', True)]
+
+
+    def get_form_context(self, form, context):
+        context = self.update_context(form, {'context': context})
+        context['zip_longest'] = itertools.zip_longest
+        context['get_macro_name'] = self.get_macro_name
+        return context
+
+
+    def get_macro_name(self, field):
+        """Stock template of the field widget, if `form.html` can render it inline"""
+        widget = field.widget
+        if widget.__class__.stream is Widget.stream and widget.__class__.__call__ is Widget.__call__ and not widget.get_renderer(field):
+            return widget.get_template_name()
 
 
 class HiddenWidget(Widget):
@@ -141,58 +478,69 @@ class CheckboxWidget(Widget):
 
 class DateWidget(TextWidget):
     """Requires: bootstrap-datepicker.js"""
-    def __call__(self, field, attrs={}, **context):
-        attrs = Attrs(attrs, {'data-role': 'datepicker'})
-        return Widget.__call__(self, field, attrs, **context)
+    def prepare(self, field, attrs, context):
+        return Attrs(attrs, {'data-role': 'datepicker'})
 
 
 class DateTimeWidget(TextWidget):
     """Requires: bootstrap-datepicker.js"""
-    def __call__(self, field, attrs={}, **context):
-        attrs = Attrs(attrs, {'data-role': 'datetimepicker'})
-        return Widget.__call__(self, field, attrs, **context)
+    def prepare(self, field, attrs, context):
+        return Attrs(attrs, {'data-role': 'datetimepicker'})
 
 
 class TextareaWidget(Widget):
     pass
 
 
+class ModelAttr:
+    """`get_option` by attribute name"""
+    __slots__ = ('name',)
+
+
+    def __init__(self, name):
+        self.name = name
+
+
+    def __call__(self, model):
+        return getattr(model, self.name) if model else ''
+
+
 class SelectWidget(Widget):
     def __init__(self, caption, options=[], get_option=None, multiple=False, attrs={}, template=None, template_dirs=[], **context):
         Widget.__init__(self, caption, attrs, template, template_dirs, **context)
         if options:
-            self.options = options if callable(options) else (lambda: options)
+            self.options = options if callable(options) else Constant(options)
         else:
-            self.options = lambda: []
+            self.options = Constant([])
         if isinstance(get_option, str):
-            self.get_option = lambda model: getattr(model, get_option) if model else ''
+            self.get_option = ModelAttr(get_option)
         else:
             self.get_option = get_option
         self.multiple = multiple
 
 
-    def __call__(self, field, attrs={}, **context):
+    def prepare(self, field, attrs, context):
         context['zip_longest'] = itertools.zip_longest
-        return Widget.__call__(self, field, attrs, **context)
+        return attrs
 
 
 class MultiCheckboxWidget(Widget):
     def __init__(self, caption, options=[], get_option=None, show_toggler=True, attrs={}, template=None, template_dirs=[], **context):
         Widget.__init__(self, caption, attrs, template, template_dirs, **context)
         if options:
-            self.options = options if callable(options) else (lambda: options)
+            self.options = options if callable(options) else Constant(options)
         else:
-            self.options = lambda: []
+            self.options = Constant([])
         if isinstance(get_option, str):
-            self.get_option = lambda model: getattr(model, get_option) if model else ''
+            self.get_option = ModelAttr(get_option)
         else:
             self.get_option = get_option
         self.show_toggler = show_toggler
 
 
-    def __call__(self, field, attrs={}, **context):
+    def prepare(self, field, attrs, context):
         context['zip_longest'] = itertools.zip_longest
-        return Widget.__call__(self, field, attrs, **context)
+        return attrs
 
 
 # FILTER WIDGETS
@@ -27,6 +27,19 @@ class StrConverter:
             raise TypeError
 
 
+    def parse_json(self, data, locale='en'):
+        """JSON strings are taken as sent (no stripping)"""
+        if type(data) == str:
+            if data:
+                return self.parse_handler(data) if self.parse_handler else data
+            else:
+                return None
+        elif data is None:
+            return None
+        else:
+            raise TypeError
+
+
     def format(self, value, locale='en'):
         data = '' if value is None else value
         return data
@@ -59,6 +72,15 @@ class BoolConverter:
             raise TypeError
 
 
+    def parse_json(self, data, locale='en'):
+        if type(data) == bool:
+            return data
+        elif data is None:
+            return self.none
+        else:
+            return self.parse(data, locale)
+
+
     def format(self, value, locale='en'):
         data = '' if value is None else str(int(value))
         return data
@@ -85,6 +107,27 @@ class IntConverter:
             raise TypeError
 
 
+    def parse_json(self, data, locale='en'):
+        """JSON numbers are locale-free: strings are parsed without babel"""
+        if type(data) == int:
+            return data
+        elif type(data) == float:
+            return int(round(data))
+        elif type(data) == str:
+            data = data.strip()
+            if data:
+                try:
+                    return int(data)
+                except Exception:
+                    raise ValueError
+            else:
+                return None
+        elif data is None:
+            return None
+        else:
+            raise TypeError
+
+
     def format(self, value, locale='en'):
         data = '' if value is None else babel.numbers.format_number(value, locale=locale)
         return data
@@ -111,6 +154,27 @@ class FloatConverter:
             raise TypeError
 
 
+    def parse_json(self, data, locale='en'):
+        """JSON numbers are locale-free: strings are parsed without babel"""
+        if type(data) == float:
+            return data
+        elif type(data) == int:
+            return float(data)
+        elif type(data) == str:
+            data = data.strip()
+            if data:
+                try:
+                    return float(data)
+                except Exception:
+                    raise ValueError
+            else:
+                return None
+        elif data is None:
+            return None
+        else:
+            raise TypeError
+
+
     def format(self, value, locale='en'):
         data = '' if value is None else babel.numbers.format_decimal(value, locale=locale)
         return data
@@ -139,6 +203,23 @@ class DecimalConverter:
             raise TypeError
 
 
+    def parse_json(self, data, locale='en'):
+        """JSON numbers are locale-free: strings are parsed without babel"""
+        if type(data) in {int, float}:
+            return decimal.Decimal(data)
+        elif type(data) == str:
+            data = data.strip()
+            if data:
+                try:
+                    return decimal.Decimal(data)
+                except Exception:
+                    raise ValueError
+            else:
+                return None
+        else:
+            return self.parse(data, locale)
+
+
     def format(self, value, locale='en'):
         data = '' if value is None else babel.numbers.format_decimal(value, locale=locale)
         return data
@@ -338,6 +419,14 @@ class MapConverter:
         return result
 
 
+    def parse_json(self, data, locale='en'):
+        if self.converter and isinstance(data, (list, tuple)):
+            parse = getattr(self.converter, 'parse_json', self.converter.parse)
+            return [parse(d, locale) for d in data]
+        else:
+            return self.parse(data, locale)
+
+
     def format(self, value, locale='en'):
         if value is None:
             return None
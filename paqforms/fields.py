@@ -36,22 +36,173 @@ Field removal is impossible
 """
 import os.path as op
 import inspect
+import asyncio
+import time
+import concurrent.futures
+import contextvars
 import sys
 import importlib
 import weakref
 import copy
 import datetime
+import decimal
+import hashlib
 import gettext
 import babel.core
 import babel.support; nt = babel.support.NullTranslations(); _ = lambda _: _
 
+from types import MappingProxyType
 from markupsafe import Markup
 from collections import OrderedDict, Sequence
 from .converters import *
 from .validators import *
+from .validators import get_cost
 from .helpers import *
+from .helpers import Constant
 from .i18n import get_translations
 from .bootstrap.widgets import *
+from .bootstrap.widgets import pristine_cache, has_dynamic_callables
+
+
+# HELPERS =======================================================================
+error_budget = contextvars.ContextVar('error_budget', default=None) # [errors left] while a form with `meta['max_errors']` feeds
+
+
+validators_by_cost = {} # id(validators) => (validators, sorted by cost), see `Prototype.get_validators`
+EMPTY_META = MappingProxyType({}) # `meta` of bound fields declared without one, see `Prototype.clone`
+
+
+def out_of_budget():
+    budget = error_budget.get()
+    return budget is not None and budget[0] <= 0
+
+
+def spend_budget():
+    budget = error_budget.get()
+    if budget is not None:
+        budget[0] -= 1
+
+
+def sync_override(field, name):
+    """Sync hook `name` is defined lower in the MRO than its `_async` twin (a subclass overrides only the sync one)"""
+    mro = field.__class__.__mro__
+    sync = next(i for i, cls in enumerate(mro) if name in cls.__dict__)
+    twin = next(i for i, cls in enumerate(mro) if name + '_async' in cls.__dict__)
+    return sync < twin
+
+
+def timed_call(provider):
+    start = time.perf_counter()
+    return materialize(provider()), time.perf_counter() - start
+
+
+async def timed_call_async(provider, executor=None):
+    start = time.perf_counter()
+    if inspect.iscoroutinefunction(provider):
+        result = await provider()
+    else:
+        call = contextvars.copy_context().run # Request-scoped context of the caller
+        result = await maybe_await(await asyncio.get_event_loop().run_in_executor(executor, call, provider))
+    return materialize(result), time.perf_counter() - start
+
+
+def fingerprint(*parts):
+    """Stable (across processes) short hash of strings"""
+    return hashlib.blake2b('\x1f'.join(parts).encode('utf-8', 'surrogatepass'), digest_size=8).hexdigest()
+
+
+def fingerprint_value(value):
+    """Stable text of a value for `fingerprint`"""
+    if value is None or isinstance(value, (str, int, float, decimal.Decimal, datetime.date, datetime.time)):
+        return repr(value)
+    elif isinstance(value, (list, tuple)):
+        return '[' + ','.join(map(fingerprint_value, value)) + ']'
+    elif isinstance(value, (set, frozenset)):
+        return '{' + ','.join(sorted(map(fingerprint_value, value))) + '}'
+    elif isinstance(value, dict):
+        return '{' + ','.join(sorted(fingerprint_value(k) + ':' + fingerprint_value(v) for k, v in value.items())) + '}'
+    else:
+        return str(value)
+
+
+def is_related_path(path, other):
+    """Same field or one contains the other ('address' and 'address.zip')"""
+    return path == other or path.startswith(other + '.') or other.startswith(path + '.')
+
+
+def get_feed_stages(prototypes):
+    """
+    Names of :arg:`prototypes` in stages for `FormField.feed_async`: fields of a stage are fed concurrently,
+    after the siblings their `RepeatValidator`s read (ties keep the declared order)
+    """
+    depends = {
+        name: {validator.fieldname for validator in getattr(prototype, 'validators', ()) if isinstance(validator, RepeatValidator)} & prototypes.keys() - {name}
+        for name, prototype in prototypes.items()
+    }
+    stages, done = [], set()
+    while len(done) < len(depends):
+        stage = [name for name in depends if name not in done and depends[name] <= done]
+        if not stage: # Cycle: the rest are fed together
+            stage = [name for name in depends if name not in done]
+        stages.append(stage)
+        done.update(stage)
+    return stages
+
+
+def without_error(messages, message):
+    """:arg:`messages` with one occurrence of the error :arg:`message` removed"""
+    errors = list(messages.get('error', []))
+    if message not in errors:
+        return messages
+    errors.remove(message)
+    if errors:
+        return dict(messages, error=errors)
+    return {key: value for key, value in messages.items() if key != 'error'} or EMPTY_MESSAGES
+
+
+def join_path(path, name):
+    return path + '.' + str(name) if path else str(name)
+
+
+def diff_values(old, new, path, changes):
+    """Puts paths where :arg:`new` differs from :arg:`old` into :arg:`changes`, down to list items and dict keys"""
+    if old == new:
+        return
+    if isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        for i, (old_item, new_item) in enumerate(zip(old, new)):
+            diff_values(old_item, new_item, join_path(path, i), changes)
+    elif isinstance(old, dict) and isinstance(new, dict):
+        for key, new_item in new.items():
+            diff_values(old.get(key), new_item, join_path(path, key), changes)
+    else:
+        changes[path] = new
+
+
+def sort_cross_validators(validators):
+    """
+    Topological order of `CrossValidator`s: each runs after the ones targeting its input fields
+    (ties keep the declared order)
+    """
+    validators = list(validators)
+    depends = [
+        {j for j, other in enumerate(validators) if j != i and other.target is not None and any(is_related_path(other.target, path) for path in validator.fields)}
+        for i, validator in enumerate(validators)
+    ]
+    order, done = [], set()
+    while len(order) < len(validators):
+        for i, validator in enumerate(validators):
+            if i not in done and depends[i] <= done:
+                order.append(validator)
+                done.add(i)
+                break
+        else:
+            raise ValueError('Cyclic dependencies between cross validators {!r}'.format([v for i, v in enumerate(validators) if i not in done]))
+    return tuple(order)
+
+
+def materialize(choices):
+    """Lazy choices (query iterators and such) would be re-run on every pass"""
+    return choices if isinstance(choices, (list, tuple, set, frozenset, dict)) else list(choices)
 
 
 # METACLASSES ==================================================================
@@ -79,6 +230,18 @@ class DeclarativeMeta(OrderedClass):
 
         cls.prototypes = prototypes
 
+        # Cross validators of bases go first, like their fields
+        cross_validators = []
+        for base in bases:
+            for validator in getattr(base, 'cross_validators', ()):
+                if validator not in cross_validators:
+                    cross_validators.append(validator)
+        for validator in attrs.get('cross_validators', ()):
+            if validator not in cross_validators:
+                cross_validators.append(validator)
+
+        cls.cross_validators = sort_cross_validators(cross_validators)
+
 
     def __iter__(cls):
         return iter(cls.prototypes.items())
@@ -88,16 +251,31 @@ class DeclarativeMeta(OrderedClass):
         if isinstance(value, Prototype):
             value.name = name
             cls.prototypes[name] = value
+            FormWidget.invalidate(cls)
+            FieldFieldWidget.invalidate(cls)
         else:
             OrderedClass.__setattr__(cls, name, value)
 
 
 # FIELDS =======================================================================
 class Prototype(metaclass=OrderedClass):
+    """
+    Declared fields keep their configuration (widget, converters, ...) in `__dict__`,
+    bound fields (`clone`) get a shallow copy of it and keep the per-feed state in `__slots__`.
+    (Reading the configuration through the prototype, with no `__dict__` per bound field,
+    makes feeding ~1.6x slower: `__getattr__` runs on every read.)
+    `meta` of a bound field is a read-only view of the prototype's one (assign a new dict instead)
+    """
+    __slots__ = ('__dict__', '__weakref__', 'name', 'master', 'index', '_fingerprint')
+    _json = False
+    _prefetched = None
+
+
     def __init__(self, meta, name):
         self.name = name
         self.meta = meta.copy()
         self.master = None
+        self.index = None
 
 
     def __repr__(self):
@@ -119,6 +297,35 @@ class Prototype(metaclass=OrderedClass):
             raise Exception('`self.widget` of type {!r} is not callable in {}'.format(type(self.widget).__name__, self))
 
 
+    def stream(self, attrs={}, **context):
+        """Like `__call__` but yields HTML chunks, for widgets that can stream"""
+        if hasattr(self.widget, 'stream'):
+            return self.widget.stream(self, attrs, **context)
+        else:
+            return iter([self(attrs, **context)])
+
+
+    async def render_async(self, attrs={}, **context):
+        """Like `__call__` but awaits async choices / options, for widgets that support it"""
+        if hasattr(self.widget, 'render_async'):
+            return await self.widget.render_async(self, attrs, **context)
+        else:
+            return self(attrs, **context)
+
+
+    def clone(self):
+        """Bound field to feed: own per-feed state and configuration (set on it, not on the prototype)"""
+        clone = object.__new__(self.__class__)
+        config = clone.__dict__ = self.__dict__.copy()
+        meta = config.get('meta')
+        if meta.__class__ is dict:
+            config['meta'] = MappingProxyType(meta) if meta else EMPTY_META
+        clone.name = self.name
+        clone.master = self.master
+        clone.index = self.index
+        return clone
+
+
     def bind(self, master, index=None):
         self.master = weakref.ref(master)
         self.index = index
@@ -135,6 +342,51 @@ class Prototype(metaclass=OrderedClass):
         return self.master().translations if self.master else nt
 
 
+    @property
+    def json(self):
+        """Data is decoded JSON (native numbers and booleans) rather than form strings"""
+        return getattr(self, '_json', False) or (self.master().json if self.master else False)
+
+
+    @property
+    def renderer(self):
+        """Widget renderer from `meta['renderer']` ('jinja' or 'python'), inherited from masters"""
+        return self.meta.get('renderer') or (self.master().renderer if self.master else None)
+
+
+    @property
+    def validation_order(self):
+        """'declared' or 'cost' (cheap validators first) from `meta['validation_order']`, inherited from masters"""
+        return self.meta.get('validation_order') or (self.master().validation_order if self.master else 'declared')
+
+
+    def get_validators(self):
+        """`validators` in execution order, see `validation_order`"""
+        validators = self.validators
+        if len(validators) < 2 or self.validation_order != 'cost':
+            return validators
+        by_cost = validators_by_cost.get(id(validators)) # Shared by clones
+        if by_cost is None or by_cost[0] is not validators:
+            if len(validators_by_cost) >= 1024:
+                validators_by_cost.clear()
+            by_cost = validators_by_cost[id(validators)] = (validators, sorted(validators, key=get_cost)) # Stable: ties keep their order
+        return by_cost[1]
+
+
+    @property
+    def prefetched(self):
+        """Choices provider => its result, filled by `FormField.prefetch` of the nearest form"""
+        prefetched = getattr(self, '_prefetched', None)
+        if prefetched is not None:
+            return prefetched
+        return self.master().prefetched if self.master else {}
+
+
+    def call_provider(self, provider):
+        prefetched = self.prefetched
+        return prefetched[provider] if provider in prefetched else provider()
+
+
     @property
     def fullname(self):
         if self.master and self.master().fullname:
@@ -152,17 +404,35 @@ class Prototype(metaclass=OrderedClass):
             return self.name
 
 
+    @property
+    def fingerprint(self):
+        """
+        Stable hash of the fed state (values, messages), for ETags and cache keys without rendering.
+        Computed on first access and kept until the next `feed`, subfields reuse their own
+        """
+        if getattr(self, '_fingerprint', None) is None:
+            self._fingerprint = self.get_fingerprint()
+        return self._fingerprint
+
+
+    @property
+    def touched(self):
+        """Fed with data or submitted, otherwise the field just holds the model value"""
+        return bool(self.feed_submit or self.feed_data or self.feed_data == 0)
+
+
     def alerts(self, **attrs):
         return self.widget.alerts(self, **attrs)
 
 
 class Field(Prototype, metaclass=OrderedClass):
+    __slots__ = ('feed_value', 'feed_data', 'feed_submit', 'value', 'messages')
     autorender = True
 
     def __init__(self, widget, default=None, required=False, converters=[], validators=[], meta={}, name=None):
         self.widget = widget
         self.default = default
-        self.required = required if callable(required) else lambda: required
+        self.required = required if callable(required) else Constant(required)
 
         self.converters = converters if isinstance(converters, (list, tuple,)) else (converters,)
         self.validators = validators if isinstance(validators, (list, tuple,)) else (validators,)
@@ -170,12 +440,6 @@ class Field(Prototype, metaclass=OrderedClass):
         Prototype.__init__(self, meta, name)
 
 
-    def clone(self):
-        clone = copy.copy(self)
-        del clone.value
-        return clone
-
-
     @property
     def caption(self):
         return self.widget.caption
@@ -208,7 +472,7 @@ class Field(Prototype, metaclass=OrderedClass):
         self.feed_data = data
         self.feed_submit = submit
         self.value = self.default
-        if submit or (data or data == 0):
+        if (submit or (data or data == 0)) and not out_of_budget():
             try:
                 self.value = self.parse_data(data)
                 if self.value is None or self.value == []:
@@ -218,11 +482,39 @@ class Field(Prototype, metaclass=OrderedClass):
                     self.validate_value(self.value)
             except ValidationError as e:
                 self.messages = {'error': [e.args[0]]}
+                spend_budget()
             else:
-                self.messages = {}
+                self.messages = EMPTY_MESSAGES
         else:
             self.value = self.default if value is None else value
-            self.messages = {}
+            self.messages = EMPTY_MESSAGES
+        self._fingerprint = None
+        return self
+
+
+    async def feed_async(self, value, data=None, submit=False):
+        """Like `feed`, awaiting async converters and validators"""
+        self.feed_value = value
+        self.feed_data = data
+        self.feed_submit = submit
+        self.value = self.default
+        if (submit or (data or data == 0)) and not out_of_budget():
+            try:
+                self.value = await self.parse_data_async(data)
+                if self.value is None or self.value == []:
+                    if self.required():
+                        raise ValidationError(self.translations.gettext('Fill the field'))
+                else:
+                    await self.validate_value_async(self.value)
+            except ValidationError as e:
+                self.messages = {'error': [e.args[0]]}
+                spend_budget()
+            else:
+                self.messages = EMPTY_MESSAGES
+        else:
+            self.value = self.default if value is None else value
+            self.messages = EMPTY_MESSAGES
+        self._fingerprint = None
         return self
 
 
@@ -233,13 +525,42 @@ class Field(Prototype, metaclass=OrderedClass):
             return self.format_value(self.value)
 
 
+    def get_fingerprint(self):
+        if self.messages:
+            return fingerprint(self.name or '', fingerprint_value(self.value), fingerprint_value(self.feed_data), fingerprint_value(self.messages))
+        else:
+            return fingerprint(self.name or '', fingerprint_value(self.value))
+
+
+    def collect_changes(self, path, changes):
+        if self.touched and self.value != self.feed_value:
+            changes[path] = self.value
+
+
     # LOW-LEVEL API
     def parse_data(self, data):
         """data => value"""
+        try:
+            if self.converters:
+                if self.json:
+                    for converter in self.converters:
+                        data = getattr(converter, 'parse_json', converter.parse)(data, self.locale)
+                else:
+                    for converter in self.converters:
+                        data = converter.parse(data, self.locale)
+            return data
+        except (TypeError, ValueError):
+            raise ValidationError(self.translations.gettext('Invalid value'))
+
+
+    async def parse_data_async(self, data):
+        if sync_override(self, 'parse_data'):
+            return self.parse_data(data)
         try:
             if self.converters:
                 for converter in self.converters:
-                    data = converter.parse(data, self.locale)
+                    parse = getattr(converter, 'parse_json', converter.parse) if self.json else converter.parse
+                    data = await maybe_await(parse(data, self.locale))
             return data
         except (TypeError, ValueError):
             raise ValidationError(self.translations.gettext('Invalid value'))
@@ -254,11 +575,20 @@ class Field(Prototype, metaclass=OrderedClass):
 
 
     def validate_value(self, value):
-        for validator in self.validators:
+        for validator in self.get_validators():
             validator(value, self)
 
 
+    async def validate_value_async(self, value):
+        if sync_override(self, 'validate_value'):
+            return self.validate_value(value)
+        for validator in self.get_validators():
+            await maybe_await(validator(value, self))
+
+
 class FieldField(Prototype, metaclass=OrderedClass): # TODO add validators! (need to check length!)
+    __slots__ = ('feed_value', 'feed_data', 'feed_submit', 'value', '_messages', '_messages_merged', 'fields')
+
     def __init__(self, widget, prototype, default=[], required=False, converters=[], validators=[], meta={}, name=None):
         self.widget = FieldFieldWidget(widget) if isinstance(widget, str) else widget
         if isinstance(prototype, Prototype):
@@ -266,7 +596,7 @@ class FieldField(Prototype, metaclass=OrderedClass): # TODO add validators! (nee
         else:
             raise ValueError('invalid `prototype` argument')
         self.default = default # TODO not in use yet
-        self.required = required if callable(required) else lambda: required
+        self.required = required if callable(required) else Constant(required)
 
         self.converters = converters if isinstance(converters, (list, tuple,)) else (converters,)
         self.validators = validators if isinstance(validators, (list, tuple,)) else (validators,)
@@ -275,36 +605,45 @@ class FieldField(Prototype, metaclass=OrderedClass): # TODO add validators! (nee
         Prototype.__init__(self, meta, name)
 
 
-    def clone(self):
-        clone = copy.copy(self)
-        del clone.fields
-        del clone.value
-        return clone
-
-
     @property
     def caption(self):
         return self.widget.caption
 
 
+    @property
+    def messages(self):
+        """Own messages and messages of rows by index, merged on first access"""
+        if not self._messages_merged:
+            messages = dict(self._messages)
+            for i, field in enumerate(self.fields):
+                messages[i] = field.messages
+            self._messages, self._messages_merged = messages, True
+        return self._messages
+
+
+    @messages.setter
+    def messages(self, messages):
+        self._messages, self._messages_merged = messages, True
+
+
     @property
     def has_error(self):
-        return 'error' in self.messages or any(field.has_error for field in self.fields)
+        return 'error' in self._messages or any(field.has_error for field in self.fields)
 
 
     @property
     def has_warning(self):
-        return 'warning' in self.messages or any(field.has_warning for field in self.fields)
+        return 'warning' in self._messages or any(field.has_warning for field in self.fields)
 
 
     @property
     def has_info(self):
-        return 'info' in self.messages or any(field.has_info for field in self.fields)
+        return 'info' in self._messages or any(field.has_info for field in self.fields)
 
 
     @property
     def has_success(self):
-        return 'success' in self.messages or any(field.has_success for field in self.fields)
+        return 'success' in self._messages or any(field.has_success for field in self.fields)
 
 
     # HIGH-LEVEL API
@@ -333,22 +672,73 @@ class FieldField(Prototype, metaclass=OrderedClass): # TODO add validators! (nee
         else:
             self.value = value
         self.value = [field.value for field in self.fields]
-        try:
-            self.value = self.convert_value(self.value)
-            if not self.value:
-                if self.required:
-                    raise ValidationError(self.translations.gettext('Fill the field'))
+        if out_of_budget(): # Fail-fast: the form has enough errors
+            self._messages = EMPTY_MESSAGES
+        else:
+            try:
+                self.value = self.convert_value(self.value)
+                if not self.value:
+                    if self.required:
+                        raise ValidationError(self.translations.gettext('Fill the field'))
+                else:
+                    self.validate_value(self.value)
+            except ValidationError as e:
+                self._messages = {'error': [e.args[0]]}
+                spend_budget()
             else:
-                self.validate_value(self.value)
-        except ValidationError as e:
-            self.messages = {'error': [e.args[0]]}
+                self._messages = EMPTY_MESSAGES
+        self._messages_merged = False
+        self._fingerprint = None
+        return self
+
+
+    async def feed_async(self, value, data=[], submit=False):
+        """Like `feed`, feeding rows concurrently and awaiting async converters and validators"""
+        self.feed_value = value
+        self.feed_data = data
+        self.feed_submit = submit
+        self.fields = []
+        if submit or data:
+            for (i, d) in enumerate(data or [], start=1):
+                self.fields.append(self.prototype.clone().bind(self, i))
+            await asyncio.gather(*(field.feed_async(None, d, submit) for field, d in zip(self.fields, data or [])))
+        else:
+            if value is not None:
+                for (i, v) in enumerate(value or [], start=1):
+                    self.fields.append(self.prototype.clone().bind(self, i))
+                await asyncio.gather(*(field.feed_async(v, None, submit) for field, v in zip(self.fields, value or [])))
+        self.value = [field.value for field in self.fields]
+        if out_of_budget(): # Fail-fast: the form has enough errors
+            self._messages = EMPTY_MESSAGES
         else:
-            self.messages = {}
-        for i, field in enumerate(self.fields):
-            self.messages[i] = field.messages
+            try:
+                self.value = await self.convert_value_async(self.value)
+                if not self.value:
+                    if self.required:
+                        raise ValidationError(self.translations.gettext('Fill the field'))
+                else:
+                    await self.validate_value_async(self.value)
+            except ValidationError as e:
+                self._messages = {'error': [e.args[0]]}
+                spend_budget()
+            else:
+                self._messages = EMPTY_MESSAGES
+        self._messages_merged = False
+        self._fingerprint = None
         return self
 
 
+    def get_fingerprint(self):
+        messages = {key: value for key, value in self._messages.items() if isinstance(value, list)}
+        return fingerprint(self.name or '', fingerprint_value(messages), *[field.fingerprint for field in self.fields])
+
+
+    def collect_changes(self, path, changes):
+        # Rows are fed from data without model values, so compare the lists
+        if self.touched:
+            diff_values(self.feed_value or [], self.value, path, changes)
+
+
     # LOW-LEVEL API
     def convert_value(self, value):
         """value => converters(value) => value"""
@@ -362,15 +752,39 @@ class FieldField(Prototype, metaclass=OrderedClass): # TODO add validators! (nee
 
 
     def validate_value(self, value):
-        for validator in self.validators:
+        for validator in self.get_validators():
             validator(value, self)
 
 
+    async def convert_value_async(self, value):
+        if sync_override(self, 'convert_value'):
+            return self.convert_value(value)
+        try:
+            if self.converters:
+                for converter in self.converters:
+                    value = await maybe_await(converter.parse(value, self.locale))
+            return value
+        except (TypeError, ValueError):
+            raise ValidationError(self.translations.gettext('Invalid value'))
+
+
+    async def validate_value_async(self, value):
+        if sync_override(self, 'validate_value'):
+            return self.validate_value(value)
+        for validator in self.get_validators():
+            await maybe_await(validator(value, self))
+
+
 class FormField(Prototype, metaclass=OrderedClass):
+    __slots__ = ('feed_value', 'feed_data', 'feed_submit', 'value', '_messages', '_messages_merged', 'fields', '_json', '_prefetched', 'prefetch_timings', '_cross_errors')
+    cross_validators = ()
+
     def __init__(self, widget, prototypes, default={}, converters=[], validators=[], meta={}, name=None):
         self.widget = FormFieldWidget(widget) if isinstance(widget, str) else widget
         if hasattr(prototypes, 'prototypes'):
             self.prototypes = prototypes.prototypes
+            if getattr(prototypes, 'cross_validators', None):
+                self.cross_validators = prototypes.cross_validators
         elif isinstance(prototypes, Sequence):
             self.prototypes = OrderedDict([(p.name, p) for p in prototypes if p])
         else:
@@ -388,31 +802,40 @@ class FormField(Prototype, metaclass=OrderedClass):
         return iter(self.fields.items())
 
 
-    def clone(self):
-        clone = copy.copy(self)
-        del clone.fields
-        del clone.value
-        return clone
+    @property
+    def messages(self):
+        """Own messages and messages of subfields by name, merged on first access"""
+        if not self._messages_merged:
+            messages = dict(self._messages)
+            for name, field in self.fields.items():
+                messages[name] = field.messages # TODO can conflict with 'error' / 'warning' / ... etc. names
+            self._messages, self._messages_merged = messages, True
+        return self._messages
+
+
+    @messages.setter
+    def messages(self, messages):
+        self._messages, self._messages_merged = messages, True
 
 
     @property
     def has_error(self):
-        return 'error' in self.messages or any(field.has_error for field in self.fields.values())
+        return 'error' in self._messages or any(field.has_error for field in self.fields.values())
 
 
     @property
     def has_warning(self):
-        return 'warning' in self.messages or any(field.has_warning for field in self.fields.values())
+        return 'warning' in self._messages or any(field.has_warning for field in self.fields.values())
 
 
     @property
     def has_info(self):
-        return 'info' in self.messages or any(field.has_info for field in self.fields.values())
+        return 'info' in self._messages or any(field.has_info for field in self.fields.values())
 
 
     @property
     def has_success(self):
-        return 'success' in self.messages or any(field.has_success for field in self.fields.values())
+        return 'success' in self._messages or any(field.has_success for field in self.fields.values())
 
 
     @property
@@ -420,6 +843,15 @@ class FormField(Prototype, metaclass=OrderedClass):
         return not self.has_error and self.feed_submit
 
 
+    @property
+    def pristine(self):
+        """Fed with nothing and without messages (set after `feed` too): renders the same for every request"""
+        return (
+            self.feed_value is None and not self.feed_data and not self.feed_submit and not self.default
+            and not (self.has_error or self.has_warning or self.has_info or self.has_success)
+        )
+
+
     @property
     def caption(self):
         if self.widget.caption:
@@ -462,13 +894,15 @@ class FormField(Prototype, metaclass=OrderedClass):
         self.feed_data = data
         self.feed_submit = submit
         self.fields = OrderedDict()
+        get_value = get_accessor(value.__class__).get
+        get_data = get_accessor(data.__class__).get
         for prototype in self.prototypes.values():
             name = prototype.name
             field = prototype.clone().bind(self)
             self.fields[name] = (
                 field.feed(
-                    xgetattr(value, name),
-                    xgetattr(data, name),
+                    get_value(value, name, None),
+                    get_data(data, name, None),
                     submit = submit
                 )
             )
@@ -481,25 +915,329 @@ class FormField(Prototype, metaclass=OrderedClass):
                 self.value = copy(self.default)
         else:
             self.value = value
+        set_value = get_accessor(self.value.__class__).set
         for field in self.fields.values():
-            xsetattr(self.value, field.name, field.value) # TODO can push fields undefined in Model
-        try:
-            self.value = self.convert_value(self.value)
-            if not self.value:
-                if self.required():
-                    raise ValidationError(self.translations.gettext('Fill the field'))
+            set_value(self.value, field.name, field.value) # TODO can push fields undefined in Model
+        self._cross_errors = None
+        errors = self.cross_validate() if self.cross_validators and (submit or data) else []
+        if out_of_budget(): # Fail-fast: the form has enough errors
+            self._messages = EMPTY_MESSAGES
+        else:
+            try:
+                self.value = self.convert_value(self.value)
+                if not self.value:
+                    if self.required():
+                        raise ValidationError(self.translations.gettext('Fill the field'))
+                else:
+                    self.validate_value(self.value)
+            except ValidationError as e:
+                self._messages = {'error': [e.args[0]]}
+                spend_budget()
             else:
-                self.validate_value(self.value)
-        except ValidationError as e:
-            self.messages = {'error': [e.args[0]]}
+                self._messages = EMPTY_MESSAGES
+        if errors:
+            self._messages = dict(self._messages, error=self._messages.get('error', []) + errors)
+        self._messages_merged = False
+        self._fingerprint = None
+        return self
+
+
+    async def feed_async(self, value, data={}, submit=False):
+        """
+        Like `feed`, awaiting async converters and validators. Subfields are fed concurrently,
+        except those read by siblings' `RepeatValidator`s: they go first (see `get_feed_stages`)
+        """
+        self.feed_value = value
+        self.feed_data = data
+        self.feed_submit = submit
+        self.fields = OrderedDict()
+        get_value = get_accessor(value.__class__).get
+        get_data = get_accessor(data.__class__).get
+        feeds = {}
+        for key, prototype in self.prototypes.items():
+            name = prototype.name
+            field = self.fields[name] = prototype.clone().bind(self)
+            feeds[key] = (field, get_value(value, name, None), get_data(data, name, None))
+        for stage in get_feed_stages(self.prototypes):
+            await asyncio.gather(*(field.feed_async(v, d, submit=submit) for field, v, d in map(feeds.get, stage)))
+        if value is None:
+            if callable(self.default):
+                self.value = self.default()
+            elif hasattr(self.default, 'copy'):
+                self.value = self.default.copy()
+            else:
+                self.value = copy(self.default)
+        else:
+            self.value = value
+        set_value = get_accessor(self.value.__class__).set
+        for field in self.fields.values():
+            set_value(self.value, field.name, field.value)
+        self._cross_errors = None
+        errors = await self.cross_validate_async() if self.cross_validators and (submit or data) else []
+        if out_of_budget(): # Fail-fast: the form has enough errors
+            self._messages = EMPTY_MESSAGES
+        else:
+            try:
+                self.value = await self.convert_value_async(self.value)
+                if not self.value:
+                    if self.required():
+                        raise ValidationError(self.translations.gettext('Fill the field'))
+                else:
+                    await self.validate_value_async(self.value)
+            except ValidationError as e:
+                self._messages = {'error': [e.args[0]]}
+                spend_budget()
+            else:
+                self._messages = EMPTY_MESSAGES
+        if errors:
+            self._messages = dict(self._messages, error=self._messages.get('error', []) + errors)
+        self._messages_merged = False
+        self._fingerprint = None
+        return self
+
+
+    def get_fingerprint(self):
+        messages = {key: value for key, value in self._messages.items() if isinstance(value, list)}
+        return fingerprint(self.name or '', fingerprint_value(messages), *[field.fingerprint for field in self.fields.values()])
+
+
+    def changes(self):
+        """
+        Changed subfields => new values, by path as in `get_field` ('email', 'address.zip', 'rows.1.amount').
+        Compares fed model values with parsed ones; subtrees fed without data are skipped
+        """
+        changes = OrderedDict()
+        self.collect_changes('', changes)
+        return changes
+
+
+    def collect_changes(self, path, changes):
+        if self.touched:
+            for name, field in self.fields.items():
+                field.collect_changes(join_path(path, name), changes)
+
+
+    def feed_flat(self, value, data={}, submit=False):
+        """
+        value or flat data => self.value
+        :arg:`data` is a flat (multi)dict like `request.form`, looked up by field fullnames
+        (no `variable_decode` step)
+        """
+        return self.feed(value, VariableView(data, self.fullname or ''), submit)
+
+
+    def feed_json(self, value, data={}, submit=False):
+        """
+        value or JSON data => self.value
+        :arg:`data` is decoded JSON, converters take their `parse_json` shortcuts
+        """
+        json, self._json = getattr(self, '_json', False), True
+        try:
+            return self.feed(value, data, submit)
+        finally:
+            self._json = json
+
+
+    def revalidate(self, path, data):
+        """
+        Live check of one field: re-feeds (as submitted) only the subfield at :arg:`path` with :arg:`data`,
+        then re-runs what depends on it: `RepeatValidator`s of its siblings and `cross_validators`
+        reading it (of this form and of the forms on the way). The rest keeps the previous feed results,
+        own validators of the enclosing forms are not re-run. Returns the re-fed subfield
+        """
+        names = path.split('.')
+        fields = self.walk(path)
+        field, master = fields[-1], fields[-2]
+        field.feed(field.feed_value, data, submit=True)
+        if isinstance(master.fields, list):
+            if isinstance(master.value, list) and int(names[-1]) < len(master.value):
+                master.value[int(names[-1])] = field.value
         else:
-            self.messages = {}
-        for name, field in self.fields.items():
-            self.messages[name] = field.messages # TODO can conflict with 'error' / 'warning' / ... etc. names
+            get_accessor(master.value.__class__).set(master.value, names[-1], field.value)
+            for sibling in master.fields.values():
+                if sibling is not field and any(isinstance(validator, RepeatValidator) and validator.fieldname == names[-1] for validator in sibling.validators):
+                    sibling.feed(sibling.feed_value, sibling.feed_data, sibling.feed_submit)
+        for container in fields[:-1]:
+            container._messages_merged = False
+            container._fingerprint = None
+        for i in reversed(range(len(fields) - 1)): # Inner forms first, their errors make outer validators skip
+            if getattr(fields[i], 'cross_validators', None):
+                fields[i].recheck('.'.join(names[i:]))
+        return field
+
+
+    def prefetch(self, max_workers=None):
+        """
+        Calls sync `choices` providers of the whole prototype tree concurrently (thread pool),
+        so validation and rendering reuse the results. Timings go to `prefetch_timings`.
+        Providers run in a copy of the caller's `contextvars` context and must be thread-safe
+        (no connections or sessions shared with other threads)
+        """
+        paths = self.get_choices_providers()
+        providers = [provider for provider in paths if not inspect.iscoroutinefunction(provider)]
+        if providers:
+            with concurrent.futures.ThreadPoolExecutor(max_workers or len(providers)) as executor:
+                futures = [executor.submit(contextvars.copy_context().run, timed_call, provider) for provider in providers]
+                results = [future.result() for future in futures]
+        else:
+            results = []
+        return self.set_prefetched(paths, providers, results)
+
+
+    async def prefetch_async(self, executor=None):
+        """Like `prefetch`, gathering async providers and running sync ones in :arg:`executor` (same requirements)"""
+        paths = self.get_choices_providers()
+        providers = list(paths)
+        results = await asyncio.gather(*(timed_call_async(provider, executor) for provider in providers))
+        return self.set_prefetched(paths, providers, results)
+
+
+    def get_choices_providers(self):
+        """`choices` callables of the prototype tree => path of the first field using it"""
+        providers = OrderedDict()
+        def walk(prototype, path):
+            provider = getattr(prototype, 'choices_provider', None)
+            if provider and provider not in providers:
+                providers[provider] = path
+            if isinstance(prototype, FormField):
+                for subprototype in prototype.prototypes.values():
+                    walk(subprototype, '.'.join(name for name in (path, subprototype.name) if name))
+            elif isinstance(prototype, FieldField):
+                walk(prototype.prototype, path)
+        for prototype in self.prototypes.values():
+            walk(prototype, prototype.name)
+        return providers
+
+
+    def set_prefetched(self, paths, providers, results):
+        self._prefetched = {provider: result for provider, (result, seconds) in zip(providers, results)}
+        self.prefetch_timings = OrderedDict((paths[provider], seconds) for provider, (result, seconds) in zip(providers, results))
         return self
 
 
     # LOW-LEVEL API
+    def walk(self, path):
+        """This form and its fed subfields down to :arg:`path` (see `get_field`)"""
+        fields = [self]
+        for name in path.split('.'):
+            field = fields[-1]
+            fields.append(field.fields[int(name)] if isinstance(field.fields, list) else field.fields[name])
+        return fields
+
+
+    def get_field(self, path):
+        """Fed subfield by dotted path: 'address.zip', 'rows.0.amount' (`FieldField` items by position)"""
+        return self.walk(path)[-1]
+
+
+    def add_error(self, path, message):
+        """Appends an error to the fed subfield at :arg:`path`"""
+        field = self.touch(path)
+        messages = field.messages
+        field.messages = dict(messages, error=messages.get('error', []) + [message])
+
+
+    def remove_error(self, path, message):
+        """Removes an error (one occurrence) from the fed subfield at :arg:`path`"""
+        field = self.touch(path)
+        field.messages = without_error(field.messages, message)
+
+
+    def touch(self, path):
+        """Subfield at :arg:`path` about to change its messages: forms on the way re-merge and re-hash"""
+        fields = self.walk(path)
+        for field in fields:
+            if field is not fields[-1]:
+                field._messages_merged = False
+            field._fingerprint = None
+        return fields[-1]
+
+
+    def recheck(self, path):
+        """Re-runs `cross_validators` reading the subfield at :arg:`path` and the ones depending on them"""
+        affected = []
+        for validator in self.cross_validators: # Topological order: dependencies come first
+            sources = [path] + [other.target for other in affected if other.target is not None]
+            if any(is_related_path(source, name) for source in sources for name in validator.fields):
+                affected.append(validator)
+        previous = self._cross_errors or {}
+        for validator in affected:
+            if validator in previous:
+                message, target = previous.pop(validator)
+                if target is None:
+                    self._messages = without_error(self._messages, message)
+                else:
+                    try:
+                        self.remove_error(target, message)
+                    except (KeyError, IndexError): # Re-fed without that item
+                        pass
+        errors = self.cross_validate(affected)
+        if errors:
+            self._messages = dict(self._messages, error=self._messages.get('error', []) + errors)
+        self._messages_merged = False
+        self._fingerprint = None
+
+
+    def get_cross_inputs(self, validator):
+        """Fed input fields of :arg:`validator`, None if it should be skipped (missing inputs, errors)"""
+        if out_of_budget():
+            return None
+        try:
+            fields = [self.get_field(path) for path in validator.fields]
+        except (KeyError, IndexError):
+            return None
+        if any(field.has_error for field in fields):
+            return None
+        return fields
+
+
+    def cross_validate(self, validators=None):
+        """Runs `cross_validators` (or :arg:`validators` of them) on fed subfields => errors of the form itself"""
+        errors = []
+        for validator in self.cross_validators if validators is None else validators:
+            fields = self.get_cross_inputs(validator)
+            if fields is None:
+                continue
+            try:
+                validator([field.value for field in fields], self)
+            except ValidationError as e:
+                spend_budget()
+                self.set_cross_error(validator, e.args[0], errors)
+        return errors
+
+
+    def set_cross_error(self, validator, message, errors):
+        """
+        Puts the error of :arg:`validator` on its target, or into :arg:`errors` of the form itself
+        if it has none or the target is missing. Remembers it for `recheck`
+        """
+        target = validator.target
+        if target is not None:
+            try:
+                self.add_error(target, message)
+            except (KeyError, IndexError):
+                target = None
+        if target is None:
+            errors.append(message)
+        if self._cross_errors is None:
+            self._cross_errors = {}
+        self._cross_errors[validator] = (message, target)
+
+
+    async def cross_validate_async(self):
+        errors = []
+        for validator in self.cross_validators: # One by one: later validators see errors of earlier ones
+            fields = self.get_cross_inputs(validator)
+            if fields is None:
+                continue
+            try:
+                await maybe_await(validator([field.value for field in fields], self))
+            except ValidationError as e:
+                spend_budget()
+                self.set_cross_error(validator, e.args[0], errors)
+        return errors
+
+
     def convert_value(self, value):
         """value => converters(value) => value"""
         try:
@@ -512,10 +1250,29 @@ class FormField(Prototype, metaclass=OrderedClass):
 
 
     def validate_value(self, value):
-        for validator in self.validators:
+        for validator in self.get_validators():
             validator(value, self)
 
 
+    async def convert_value_async(self, value):
+        if sync_override(self, 'convert_value'):
+            return self.convert_value(value)
+        try:
+            if self.converters:
+                for converter in self.converters:
+                    value = await maybe_await(converter.parse(value, self.locale))
+            return value
+        except (TypeError, ValueError):
+            raise ValidationError(self.translations.gettext('Invalid value'))
+
+
+    async def validate_value_async(self, value):
+        if sync_override(self, 'validate_value'):
+            return self.validate_value(value)
+        for validator in self.get_validators():
+            await maybe_await(validator(value, self))
+
+
 class BaseForm(FormField, metaclass=DeclarativeMeta):
     meta = {}
 
@@ -529,16 +1286,42 @@ class BaseForm(FormField, metaclass=DeclarativeMeta):
         translations = nt,
         meta = {},
         name = None,
+        json = False,
+        prefetch = False,
     ):
         name = name or self.meta.get('name', None)
-        FormField.__init__(self, FormWidget(''), self.prototypes, default, meta=meta, name=name)
+        FormField.__init__(self, FormWidget(''), self.prototypes, default, meta=dict(self.meta, **meta), name=name)
+        self._json = json
         self._locale = babel.core.Locale.parse(locale or 'en')
         self._translations = get_translations(self._locale) if isinstance(translations, gettext.NullTranslations) else translations
+        if prefetch:
+            self.prefetch()
         self.feed(model, data, submit)
 
 
     def feed(self, model, data={}, submit=False): # TODO need this method (kinda python bug) ??
-        return FormField.feed(self, model, data, submit)
+        """
+        With `meta={'max_errors': N}` feeding stops after N errors (fail-fast for APIs):
+        the rest of fields are neither parsed nor validated and keep model values
+        """
+        token = error_budget.set([self.meta['max_errors']]) if self.meta.get('max_errors') else None
+        try:
+            return FormField.feed(self, model, data, submit)
+        finally:
+            if token is not None:
+                error_budget.reset(token)
+
+
+    async def feed_async(self, model, data={}, submit=False):
+        """
+        Async counterpart of `feed`: `form = Form(None); await form.feed_async(model, data, submit)`
+        """
+        token = error_budget.set([self.meta['max_errors']]) if self.meta.get('max_errors') else None
+        try:
+            return await FormField.feed_async(self, model, data, submit)
+        finally:
+            if token is not None:
+                error_budget.reset(token)
 
 
     @property
@@ -551,6 +1334,37 @@ class BaseForm(FormField, metaclass=DeclarativeMeta):
         return self._translations
 
 
+    @property
+    def etag(self):
+        """HTTP `ETag` of the fed state, changes with values, messages, locale and `meta['version']`"""
+        return '"{}"'.format(self.fingerprint)
+
+
+    def get_fingerprint(self):
+        cls = self.__class__
+        return fingerprint(cls.__module__, cls.__qualname__, str(self.meta.get('version', '')), str(self.locale), FormField.get_fingerprint(self))
+
+
+    @classmethod
+    def render_pristine(cls, attrs={}, locale=None, **context):
+        """
+        HTML of the empty form. With `meta={'cache_pristine': True}` it is served from cache,
+        the form is created and fed only on a miss (see `FormWidget` for forms with dynamic callables).
+        """
+        key = None
+        cache_pristine = cls.meta.get('cache_pristine', FormWidget.cache_pristine)
+        if cache_pristine and (cache_pristine == 'always' or not has_dynamic_callables(cls)):
+            key = FormWidget.make_pristine_key(
+                cls, cls.meta.get('name'), babel.core.Locale.parse(locale or 'en'), cls.meta.get('renderer') or FormWidget.renderer,
+                cls.meta.get('single_template', FormWidget.single_template), attrs, context
+            )
+        html = pristine_cache.get(key) if key else None
+        if html is None:
+            form = cls(None, locale=locale)
+            html = form(attrs, **context)
+        return html
+
+
     @classmethod
     def deepcopy(cls):
         class CopyForm(cls):
@@ -572,17 +1386,30 @@ class ChoiceField(Field):
         name = None
     ):
         widget = SelectWidget(widget) if isinstance(widget, str) else widget
-        if choices:
-            self.choices = choices if callable(choices) else (lambda: choices)
-        else:
-            self.choices = lambda: []
+        self.choices_provider = choices if callable(choices) else None
+        self.static_choices = None if callable(choices) else (choices or [])
         Field.__init__(self, widget, default, required, converters, validators, meta, name)
 
 
+    def choices(self):
+        if self.choices_provider:
+            return self.call_provider(self.choices_provider)
+        else:
+            return self.static_choices
+
+
     # LOW-LEVEL API
     def validate_value(self, value):
         Field.validate_value(self, value)
-        choices = self.choices()
+        self.validate_choice(value, self.choices())
+
+
+    async def validate_value_async(self, value):
+        await Field.validate_value_async(self, value)
+        self.validate_choice(value, await maybe_await(self.choices()))
+
+
+    def validate_choice(self, value, choices):
         if choices:
             if value not in choices:
                 raise ValidationError(
@@ -609,13 +1436,18 @@ class MultiChoiceField(Field):
         name = None
     ):
         widget = MultiCheckboxWidget(widget) if isinstance(widget, str) else widget
-        if choices:
-            self.choices = choices if callable(choices) else (lambda: choices)
-        else:
-            self.choices = lambda: []
+        self.choices_provider = choices if callable(choices) else None
+        self.static_choices = None if callable(choices) else (choices or [])
         Field.__init__(self, widget, default, required, converters, validators, meta, name)
 
 
+    def choices(self):
+        if self.choices_provider:
+            return self.call_provider(self.choices_provider)
+        else:
+            return self.static_choices
+
+
     # HIGH-LEVEL API
     def format(self):
         raise Exception('Undefined behavior. Use `format_value` instead!')
@@ -624,7 +1456,15 @@ class MultiChoiceField(Field):
     # LOW-LEVEL API
     def validate_value(self, value):
         Field.validate_value(self, value)
-        choices = self.choices()
+        self.validate_choice(value, self.choices())
+
+
+    async def validate_value_async(self, value):
+        await Field.validate_value_async(self, value)
+        self.validate_choice(value, await maybe_await(self.choices()))
+
+
+    def validate_choice(self, value, choices):
         if choices:
             for v in value:
                 if v not in choices:
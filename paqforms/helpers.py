@@ -1,28 +1,80 @@
+import inspect
+
 from copy import copy
-from collections import MutableMapping
+from collections import Mapping, MutableMapping, namedtuple
+
+
+# ACCESSORS
+Accessor = namedtuple('Accessor', ('has', 'get', 'set'))
+
+
+def mapping_has(model, name):
+    return name in model
+
+
+def mapping_get(model, name, default):
+    return model.get(name, default)
+
+
+def mapping_set(model, name, value):
+    model[name] = value
+
+
+dict_accessor = Accessor(dict.__contains__, dict.get, dict.__setitem__)
+mapping_accessor = Accessor(mapping_has, mapping_get, mapping_set)
+readonly_mapping_accessor = Accessor(mapping_has, mapping_get, setattr)
+object_accessor = Accessor(hasattr, getattr, setattr)
+
+adapters = {} # registered by user
+accessors = {} # resolved per model class
+
+
+def register_accessor(cls, has=hasattr, get=getattr, set=setattr):
+    """
+    Teach `xhasattr` / `xgetattr` / `xsetattr` how to access `cls` models (and subclasses),
+    e.g. ORM documents with their own field API.
+    :param has: func(model, name) => bool
+    :param get: func(model, name, default) => value
+    :param set: func(model, name, value)
+    """
+    adapters[cls] = Accessor(has, get, set)
+    accessors.clear()
+
+
+def get_accessor(cls):
+    """Resolve (once per class) how models of `cls` are accessed"""
+    try:
+        return accessors[cls]
+    except KeyError:
+        for base in cls.__mro__:
+            if base in adapters:
+                accessor = adapters[base]
+                break
+        else:
+            if cls is dict:
+                accessor = dict_accessor
+            elif issubclass(cls, MutableMapping):
+                accessor = mapping_accessor
+            elif issubclass(cls, Mapping):
+                accessor = readonly_mapping_accessor
+            else:
+                accessor = object_accessor
+        accessors[cls] = accessor
+        return accessor
 
 
 def xhasattr(model, name):
-    if isinstance(model, MutableMapping):
-        return name in model
-    else:
-        return hasattr(model, name)
+    return get_accessor(model.__class__).has(model, name)
 
 
 def xgetattr(model, name, default=None):
-    if callable(default):
+    if default is not None and callable(default):
         default = default()
-    if isinstance(model, MutableMapping):
-        return model.get(name, default)
-    else:
-        return getattr(model, name, default)
+    return get_accessor(model.__class__).get(model, name, default)
 
 
 def xsetattr(model, name, value):
-    if isinstance(model, MutableMapping):
-        model[name] = value
-    else:
-        setattr(model, name, value)
+    get_accessor(model.__class__).set(model, name, value)
 
 
 def variable_decode(d, dict_char='.', list_char='-'):
@@ -110,6 +162,109 @@ def variable_decode(d, dict_char='.', list_char='-'):
     return result
 
 
+class VariableView(Mapping):
+    """
+    Read-only nested view of the flat dictionary d (the same input as for `variable_decode`).
+
+    Keys are resolved by lookup on access, so feeding a form from `VariableView(request.form)`
+    doesn't build (and then walk) the whole nested structure. Repeated keys give lists,
+    `name-N` keys give lists ordered by N, `name.sub` keys give nested views.
+    """
+    def __init__(self, d, prefix='', dict_char='.', list_char='-', _index=None):
+        self.data = d
+        self.prefix = prefix
+        self.dict_char = dict_char
+        self.list_char = list_char
+        self.index = _index if _index is not None else self.build_index(d, dict_char, list_char)
+
+
+    @staticmethod
+    def build_index(d, dict_char='.', list_char='-'):
+        """
+        Single pass over keys: collects nested prefixes, list indexes and `--repetitions` counters
+        """
+        prefixes = set()
+        indexes = {}
+        lengths = {}
+        for key in d.keys():
+            if key.endswith('--repetitions'):
+                lengths[key[:-len('--repetitions')]] = int(d[key])
+                continue
+            path = ''
+            for k in key.split(dict_char):
+                if path:
+                    prefixes.add(path)
+                    path = path + dict_char + k
+                else:
+                    path = k
+                head, sep, tail = k.rpartition(list_char)
+                if sep and tail.isdigit():
+                    indexes.setdefault(path[:len(path) - len(tail) - 1], set()).add(int(tail))
+        return prefixes, indexes, lengths
+
+
+    def key(self, name):
+        return self.prefix + self.dict_char + name if self.prefix else name
+
+
+    def lookup(self, key):
+        data = self.data
+        if key in data:
+            if hasattr(data, 'getlist'):
+                values = data.getlist(key)
+                return values[0] if len(values) == 1 else values
+            else:
+                return data[key]
+        prefixes, indexes, lengths = self.index
+        if key in indexes:
+            result = [self.lookup(key + self.list_char + str(i)) for i in sorted(indexes[key])]
+            if key in lengths and len(result) < lengths[key]:
+                result.extend([''] * (lengths[key] - len(result)))
+            return result
+        if key in lengths:
+            return [''] * lengths[key]
+        if key in prefixes:
+            return VariableView(self.data, key, self.dict_char, self.list_char, self.index)
+        raise KeyError(key)
+
+
+    def __getitem__(self, name):
+        return self.lookup(self.key(name))
+
+
+    def __contains__(self, name):
+        try:
+            self[name]
+        except KeyError:
+            return False
+        else:
+            return True
+
+
+    def __iter__(self):
+        start = self.prefix + self.dict_char if self.prefix else ''
+        seen = set()
+        for key in self.data.keys():
+            if key.startswith(start):
+                name = key[len(start):].split(self.dict_char, 1)[0]
+                head, sep, tail = name.rpartition(self.list_char)
+                if sep and tail.isdigit():
+                    name = head
+                elif name.endswith('--repetitions'):
+                    name = name[:-len('--repetitions')]
+                if name not in seen:
+                    seen.add(name)
+                    yield name
+
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+    def __repr__(self):
+        return '<VariableView: prefix={!r}>'.format(self.prefix)
+
+
 def variable_encode(d, prepend='', result=None, add_repetitions=True, dict_char='.', list_char='-'):
     """
     Encode a nested structure into a flat dictionary.
@@ -141,23 +296,163 @@ def variable_encode(d, prepend='', result=None, add_repetitions=True, dict_char=
     return result
 
 
-def form_encode(data):
-    data = variable_encode(data)
-    for key, value in data.items():
-        if value is None:
-            data[key] = ''
-        elif value is False:
-            data[key] = '0'
-        elif value is True:
-            data[key] = '1'
-        elif hasattr(value, 'id'):
-            data[key] = value.id
+# VALUE ENCODERS
+def encode_none(value):
+    return ''
+
+
+def encode_bool(value):
+    return '1' if value else '0'
+
+
+def encode_str(value):
+    return value
+
+
+def encode_default(value):
+    return value.id if hasattr(value, 'id') else str(value)
+
+
+value_encoders = { # registered by type
+    type(None): encode_none,
+    bool: encode_bool,
+    str: encode_str,
+    int: str,
+    float: str,
+}
+encoders = {} # resolved per value class
+
+
+def register_value_encoder(cls, encoder):
+    """
+    Set how `form_encode` turns `cls` values (and subclasses) into strings
+    :param encoder: func(value) => str
+    """
+    value_encoders[cls] = encoder
+    encoders.clear()
+
+
+def get_value_encoder(cls):
+    """Resolve (once per class) the encoder of `cls` values. Containers resolve to `None`"""
+    try:
+        return encoders[cls]
+    except KeyError:
+        if issubclass(cls, (dict, list)):
+            encoder = None
         else:
-            data[key] = str(value)
-    return data
+            for base in cls.__mro__:
+                if base in value_encoders:
+                    encoder = value_encoders[base]
+                    break
+            else:
+                encoder = encode_default
+        encoders[cls] = encoder
+        return encoder
+
+
+def form_encode(data, add_repetitions=True, dict_char='.', list_char='-'):
+    """
+    Encode a nested structure into a flat dictionary of form strings.
+
+    Same keys as `variable_encode`, but values are encoded (see `register_value_encoder`)
+    while walking, in a single iterative pass.
+    """
+    result = {}
+    stack = [('', data)]
+    while stack:
+        prepend, d = stack.pop()
+        if isinstance(d, dict):
+            prefix = prepend + dict_char if prepend else ''
+            for key, value in d.items():
+                name = prepend if key is None else prefix + str(key)
+                cls = value.__class__
+                encoder = encoders[cls] if cls in encoders else get_value_encoder(cls)
+                if encoder is None:
+                    stack.append((name, value))
+                else:
+                    result[name] = encoder(value)
+        elif isinstance(d, list):
+            prefix = prepend + list_char
+            for i, value in enumerate(d):
+                name = prefix + str(i)
+                cls = value.__class__
+                encoder = encoders[cls] if cls in encoders else get_value_encoder(cls)
+                if encoder is None:
+                    stack.append((name, value))
+                else:
+                    result[name] = encoder(value)
+            if add_repetitions:
+                result[prepend + '--repetitions' if prepend else '__repetitions__'] = str(len(d))
+        else:
+            result[prepend] = get_value_encoder(d.__class__)(d)
+    return result
+
+
+# ASYNC
+async def maybe_await(value):
+    """Result of a sync or async call"""
+    if inspect.isawaitable(value):
+        return await value
+    else:
+        return value
+
+
+# CONSTANTS
+class Constant:
+    """`lambda: value` for static settings, told apart from user callables by caches"""
+    __slots__ = ('value',)
+
+
+    def __init__(self, value):
+        self.value = value
+
+
+    def __call__(self):
+        return self.value
+
+
+# READ-ONLY DICTS
+class ReadonlyDict(dict):
+    """Read-only dict shared between objects, copies (`dict(d)`, `copy`) are mutable"""
+    __slots__ = ()
+    _readonly_message = 'The dict is shared, assign a new dict instead'
+
+
+    def readonly(self, *args, **kwargs):
+        raise TypeError(self._readonly_message)
+
+
+    __setitem__ = __delitem__ = __ior__ = setdefault = update = pop = popitem = clear = readonly
+
+
+    def copy(self):
+        return dict(self)
+
+
+    def __reduce__(self):
+        return (self.__class__, (dict(self),))
+
+
+# MESSAGES
+class EmptyMessages(ReadonlyDict):
+    """Read-only `{}`, shared by all fields without messages"""
+    __slots__ = ()
+    _readonly_message = 'Messages of a field without messages are shared, assign a new dict instead'
+
+
+    def __reduce__(self):
+        return (EmptyMessages, ())
+
+
+EMPTY_MESSAGES = EmptyMessages()
 
 
 __all__ = (
+    'register_accessor', 'get_accessor',
     'xhasattr', 'xgetattr', 'xsetattr',
-    'variable_decode', 'variable_encode', 'form_encode',
+    'variable_decode', 'VariableView', 'variable_encode',
+    'register_value_encoder', 'form_encode',
+    'maybe_await',
+    'ReadonlyDict',
+    'EMPTY_MESSAGES',
 )
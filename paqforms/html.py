@@ -1,12 +1,47 @@
 import collections
+import functools
 import html
 import re
 
 from markupsafe import Markup
 
 
+whitespace_re = re.compile(r'\s+')
+dashes_re = re.compile(r'[-]+')
+
+
+cached_attr_names = frozenset(['class', 'type', 'id', 'name', 'for', 'data-name', 'data-widget', 'data-tag', 'data-role', 'data-action'])
+# ^ Attributes with static values (markup, field paths), worth caching. Others (`value`, ...) may carry form data: never cached
+
+
+def render_attr(value, oneval=False):
+    """Attribute value => escaped HTML"""
+    value = ' '.join(filter(None, value.split(' '))).strip()
+    result = html.escape(value, True).replace('&#x27;', "'")
+    if oneval:
+        result = dashes_re.sub('-', whitespace_re.sub('-', result))
+    return result
+
+
+render_cached_attr = functools.lru_cache(maxsize=4096)(render_attr) # Forms repeat the same static values over and over
+
+
+def render_attr_value(value, name=None):
+    """Raw `Attrs` value => escaped HTML, same as `str(Attr(value))`. Cached for `cached_attr_names`"""
+    if value is True:
+        return '1'
+    render = render_cached_attr if name in cached_attr_names else render_attr
+    if value.__class__ is str:
+        return render(value)
+    else:
+        return render(str(value))
+
+
 class Attr(collections.Sequence):
     """HTML attribute. Provides seamless concatenation and escaping"""
+    __slots__ = ('value', 'oneval')
+
+
     def __init__(self, value, oneval=False):
         if value is None:
             self.value = ''
@@ -20,10 +55,7 @@ class Attr(collections.Sequence):
 
 
     def __str__(self):
-        chunks = filter(None, self.value.split(' '))
-        value = ' '.join(chunks).strip()
-        result = html.escape(value, True).replace('&#x27;', "'")
-        return self.clean_oneval_str(result) if self.oneval else result
+        return render_attr(self.value, self.oneval)
 
 
     def __add__(self, other):
@@ -53,8 +85,7 @@ class Attr(collections.Sequence):
 
 
     def clean_oneval_str(self, data):
-        result = re.subn('\s+', '-', data)[0]
-        return re.subn('[-]+', '-', result)[0]
+        return dashes_re.sub('-', whitespace_re.sub('-', data))
 
 
 class Attrs(dict):
@@ -100,8 +131,8 @@ class Attrs(dict):
 
     def __str__(self):
         return ' '.join(
-            '{}="{}"'.format(key, self[key]) for key in sorted(self)
-            if not key.startswith('_') and self[key] is not False and self[key] is not None
+            key + '="' + render_attr_value(value, key) + '"' for key, value in sorted(dict.items(self))
+            if value is not False and value is not None and not key.startswith('_')
         )
 
 
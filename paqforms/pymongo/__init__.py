@@ -1,5 +1,5 @@
 from .converters import *
-from .helpers import get_filters, get_sorts
+from .helpers import get_filters, get_collation, get_sorts, get_update, get_writes, bulk_write
 
 
 __all__ = (
@@ -8,5 +8,9 @@ __all__ = (
 
     # HELPERS
     'get_filters',
+    'get_collation',
     'get_sorts',
+    'get_update',
+    'get_writes',
+    'bulk_write',
 )
\ No newline at end of file
@@ -1,3 +1,5 @@
+import re
+import weakref
 from decimal import Decimal
 from datetime import datetime, timedelta
 try:
@@ -5,167 +7,312 @@ try:
 except ImportError:
     from singledispatch import singledispatch
 
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
 from ..converters import *
+from ..helpers import get_accessor
+from ..fields import FieldField
 
 
-@singledispatch
-def value_to_query(converter, command, name, value, filter):
-    pass # Do nothing (keep filters as is)
+# Text filter modes, `meta={'text_index': ...}` of `FilterTextField`:
+#   None         case-insensitive regexes (no index support)
+#   'prefix'     case-sensitive regexes, `starts_with` is anchored and uses an index on the field
+#   'shadow'     lowercased values on a normalized shadow field (`meta['shadow']`, `name + '_lower'`
+#                by default), `starts_with` is a range on its index
+#   'collation'  plain values, the query runs with `get_collation` (`meta['collation']`, required) on a
+#                case-insensitive collation index, `starts_with` is a range on it (bounds compare by the
+#                collation, so strings equal to the prefix at its strength match too)
+TEXT_INDEX_MODES = (None, 'prefix', 'shadow', 'collation')
+
+
+def prefix_range(prefix):
+    """
+    Range of strings starting with :arg:`prefix`: {'$gte': prefix, '$lt': next prefix}.
+    The next prefix skips surrogates (not valid UTF-8) and carries over trailing U+10FFFF
+    """
+    head = prefix.rstrip('\U0010ffff')
+    if not head: # Only U+10FFFF: no upper bound
+        return {'$gte': prefix}
+    last = ord(head[-1]) + 1
+    if 0xd800 <= last <= 0xdfff:
+        last = 0xe000
+    return {'$gte': prefix, '$lt': head[:-1] + chr(last)}
+
+
+# HANDLERS: func(name, value, filters), by command
+def empty(name, value, filters):
+    if value == 'yes':
+        filters[name] = None
+    elif value == 'no':
+        filters[name] = {'$ne': None}
+
+
+def text_equals(name, value, filters):
+    if value:
+        filters[name] = value
 
 
-@value_to_query.register(StrConverter)
-def _(converter, command, name, value, filters):
+def text_not_equals(name, value, filters):
+    if value:
+        filters[name] = {'$ne': value}
+
+
+def get_text_handlers(meta):
+    mode = meta.get('text_index')
+    if mode not in TEXT_INDEX_MODES:
+        raise ValueError('Invalid text index mode {!r}'.format(mode))
+    if mode == 'collation' and not meta.get('collation'):
+        raise ValueError("Text index mode 'collation' requires `meta['collation']`")
+    options = {'$options': 'i'} if mode is None or mode == 'collation' else {}
+
     def contains(name, value, filters):
         if value:
-            filters[name] = {'$regex': value, '$options': '-i'} # TODO -i breaks index support
+            filters[name] = dict({'$regex': re.escape(value)}, **options)
 
     def starts_with(name, value, filters):
         if value:
-            filters[name] = {'$regex': '^' + value, '$options': '-i'} # TODO -i breaks index support
+            if mode == 'shadow' or mode == 'collation':
+                filters[name] = prefix_range(value)
+            else:
+                filters[name] = dict({'$regex': '^' + re.escape(value)}, **options)
 
-    def equals(name, value, filters):
-        if value:
-            filters[name] = value
+    def on_shadow(handler):
+        shadow = meta.get('shadow')
+        def on_shadow(name, value, filters):
+            handler(shadow or name + '_lower', value.lower() if value else value, filters)
+        return on_shadow
 
-    def not_equals(name, value, filters):
-        if value:
-            filters[name] = {'$ne': value}
-
-    def empty(name, value, filters):
-        if value == 'yes':
-            filters[name] = None
-        elif value == 'no':
-            filters[name] = {'$ne': None}
-
-    locals()[command](name, value, filters)
-
-
-@value_to_query.register(IntConverter)
-@value_to_query.register(FloatConverter)
-@value_to_query.register(DecimalConverter)
-def _(converter, command, name, value, filters):
-    def equals(name, value, filters):
-        if value is not None:
-            filters[name] = value
-
-    def not_equals(name, value, filters):
-        if value is not None:
-            filters[name] = {'$ne': value}
-
-    def between(name, value, filters):
-        hasmin = bool(value['min']) or (value['min'] == 0)
-        hasmax = bool(value['max']) or (value['max'] == 0)
-
-        if hasmin and hasmax:
-            filters[name] = {'$gte': value['min'], '$lte': value['max']}
-        elif hasmin:
-            filters[name] = {'$gte': value['min']}
-        elif hasmax:
-            filters[name] = {'$lte': value['max']}
-        if hasmin or hasmax:
-            if value.get('unit'):
-                filters[name + '_unit'] = value['unit']
-
-    def empty(name, value, filters):
-        if value == 'yes':
-            filters[name] = None
-        elif value == 'no':
-            filters[name] = {'$ne': None}
-
-    locals()[command](name, value, filters)
-
-
-@value_to_query.register(DateTimeConverter)
-def _(converter, command, name, value, filters):
-    def equals(name, value, filters):
-        if value:
-            samesec = datetime(value.year, value.month, value.day, value.hour, value.minute, value.second)
-            nextsec = samesec + timedelta(seconds=1)
-            filters[name] = {'$gte': samesec, '$lt': nextsec}
+    handlers = {'contains': contains, 'starts_with': starts_with, 'equals': text_equals, 'not_equals': text_not_equals, 'empty': empty}
+    if mode == 'shadow':
+        handlers = {command: handler if command == 'empty' else on_shadow(handler) for command, handler in handlers.items()}
+    return handlers
 
-    def not_equals(name, value, filters):
-        if value:
-            samesec = datetime(value.year, value.month, value.day, value.hour, value.minute, value.second)
-            nextsec = samesec + timedelta(seconds=1)
-            filters.setdefault('$or', []).extend(
-                [{name: {'$lt': samesec}}, {name: {'$gte': nextsec}}]
-            )
-
-    def empty(name, value, filters):
-        if value == 'yes':
-            filters[name] = None
-        elif value == 'no':
-            filters[name] = {'$ne': None}
-
-    def between(name, value, filters):
-        if value['min'] and value['max']:
-            filters[name] = {'$gte': value['min'], '$lte': value['max']}
-        elif value['min']:
-            filters[name] = {'$gte': value['min']}
-        elif value['max']:
-            filters[name] = {'$lte': value['max']}
-
-    locals()[command](name, value, filters)
-
-
-@value_to_query.register(DateConverter)
-def _(converter, command, name, value, filters):
-    def equals(name, value, filters):
-        if value:
-            sameday = datetime(value.year, value.month, value.day)
-            nextday = sameday + timedelta(hours=24)
-            filters[name] =  {'$gte': sameday, '$lt': nextday}
 
-    def not_equals(name, value, filters):
-        if value:
-            sameday = datetime(value.year, value.month, value.day)
-            nextday = sameday + timedelta(hours=24)
-            filters.setdefault('$or', []).extend(
-                [{name: {'$lt': sameday}}, {name: {'$gte': nextday}}]
-            )
-
-    def between(name, value, filters):
-        if value['min'] and value['max']:
-            minday = datetime(value['min'].year, value['min'].month, value['min'].day)
-            maxday = datetime(value['max'].year, value['max'].month, value['max'].day)
-            maxday = maxday + timedelta(days=1)
-            filters[name] = {'$gte': minday, '$lt': maxday}
-        elif value['min']:
-            minday = datetime(value['min'].year, value['min'].month, value['min'].day)
-            filters[name] = {'$gte': minday}
-        elif value['max']:
-            maxday = datetime(value['max'].year, value['max'].month, value['max'].day)
-            maxday = maxday + timedelta(days=1)
-            filters[name] = {'$lt': maxday}
-
-    def empty(name, value, filters):
-            if value == 'yes':
-                filters[name] = None
-            elif value == 'no':
-                filters[name] = {'$ne': None}
-
-    locals()[command](name, value, filters)
+def number_equals(name, value, filters):
+    if value is not None:
+        filters[name] = value
+
+
+def number_not_equals(name, value, filters):
+    if value is not None:
+        filters[name] = {'$ne': value}
+
+
+def number_between(name, value, filters):
+    hasmin = bool(value['min']) or (value['min'] == 0)
+    hasmax = bool(value['max']) or (value['max'] == 0)
+
+    if hasmin and hasmax:
+        filters[name] = {'$gte': value['min'], '$lte': value['max']}
+    elif hasmin:
+        filters[name] = {'$gte': value['min']}
+    elif hasmax:
+        filters[name] = {'$lte': value['max']}
+    if hasmin or hasmax:
+        if value.get('unit'):
+            filters[name + '_unit'] = value['unit']
+
+
+def datetime_equals(name, value, filters):
+    if value:
+        samesec = datetime(value.year, value.month, value.day, value.hour, value.minute, value.second)
+        nextsec = samesec + timedelta(seconds=1)
+        filters[name] = {'$gte': samesec, '$lt': nextsec}
+
+
+def datetime_not_equals(name, value, filters):
+    if value:
+        samesec = datetime(value.year, value.month, value.day, value.hour, value.minute, value.second)
+        nextsec = samesec + timedelta(seconds=1)
+        filters.setdefault('$or', []).extend(
+            [{name: {'$lt': samesec}}, {name: {'$gte': nextsec}}]
+        )
+
+
+def datetime_between(name, value, filters):
+    if value['min'] and value['max']:
+        filters[name] = {'$gte': value['min'], '$lte': value['max']}
+    elif value['min']:
+        filters[name] = {'$gte': value['min']}
+    elif value['max']:
+        filters[name] = {'$lte': value['max']}
+
+
+def date_equals(name, value, filters):
+    if value:
+        sameday = datetime(value.year, value.month, value.day)
+        nextday = sameday + timedelta(hours=24)
+        filters[name] =  {'$gte': sameday, '$lt': nextday}
+
+
+def date_not_equals(name, value, filters):
+    if value:
+        sameday = datetime(value.year, value.month, value.day)
+        nextday = sameday + timedelta(hours=24)
+        filters.setdefault('$or', []).extend(
+            [{name: {'$lt': sameday}}, {name: {'$gte': nextday}}]
+        )
+
+
+def date_between(name, value, filters):
+    if value['min'] and value['max']:
+        minday = datetime(value['min'].year, value['min'].month, value['min'].day)
+        maxday = datetime(value['max'].year, value['max'].month, value['max'].day)
+        maxday = maxday + timedelta(days=1)
+        filters[name] = {'$gte': minday, '$lt': maxday}
+    elif value['min']:
+        minday = datetime(value['min'].year, value['min'].month, value['min'].day)
+        filters[name] = {'$gte': minday}
+    elif value['max']:
+        maxday = datetime(value['max'].year, value['max'].month, value['max'].day)
+        maxday = maxday + timedelta(days=1)
+        filters[name] = {'$lt': maxday}
+
+
+NUMBER_HANDLERS = {'equals': number_equals, 'not_equals': number_not_equals, 'between': number_between, 'empty': empty}
+DATETIME_HANDLERS = {'equals': datetime_equals, 'not_equals': datetime_not_equals, 'between': datetime_between, 'empty': empty}
+DATE_HANDLERS = {'equals': date_equals, 'not_equals': date_not_equals, 'between': date_between, 'empty': empty}
+
+
+@singledispatch
+def get_handlers(converter, meta={}):
+    """Converter of a filter field => {command: handler}, empty for converters without queries"""
+    return {}
+
+
+@get_handlers.register(StrConverter)
+def _(converter, meta={}):
+    return get_text_handlers(meta)
+
+
+@get_handlers.register(IntConverter)
+@get_handlers.register(FloatConverter)
+@get_handlers.register(DecimalConverter)
+def _(converter, meta={}):
+    return NUMBER_HANDLERS
+
+
+@get_handlers.register(DateTimeConverter)
+def _(converter, meta={}):
+    return DATETIME_HANDLERS
+
+
+@get_handlers.register(DateConverter)
+def _(converter, meta={}):
+    return DATE_HANDLERS
+
+
+@singledispatch
+def value_to_query(converter, command, name, value, filters, meta={}):
+    """
+    Puts the query of one filter value into :arg:`filters`, dispatched by converter.
+    Stock converters go through `get_handlers`; implementations registered for other ones
+    (`value_to_query.register(MyConverter)`) are used by `FilterTranslator` as well
+    """
+    handlers = get_handlers(converter, meta)
+    if handlers:
+        handlers[command](name, value, filters)
+
+
+class RegisteredHandlers:
+    """{command: handler} calling the `value_to_query` implementation registered for a converter"""
+    def __init__(self, query, converter, meta):
+        self.query = query
+        self.converter = converter
+        self.meta = meta
+
+
+    def __getitem__(self, command):
+        def handler(name, value, filters):
+            self.query(self.converter, command, name, value, filters, self.meta)
+        return handler
+
+
+    get = __getitem__
+
+
+def get_query_handlers(converter, meta={}):
+    """`get_handlers`, unless an implementation of `value_to_query` is registered for the converter"""
+    query = value_to_query.dispatch(converter.__class__)
+    if query is value_to_query.dispatch(object):
+        return get_handlers(converter, meta)
+    return RegisteredHandlers(query, converter, meta)
+
+
+class FilterTranslator:
+    """
+    Filter form compiled into a flat plan: field kinds, converters and text modes are resolved once,
+    so a query is one loop over fed values. `get_filters` keeps one per form class
+    """
+    def __init__(self, prototypes):
+        self.prototypes = tuple(prototypes.values())
+        self.plan = [] # (name, handlers by command, None) or (name, None, handler)
+        for name, prototype in prototypes.items():
+            meta = prototype.meta
+            if hasattr(prototype, 'prototypes'):
+                if 'command' in prototype.prototypes:
+                    handlers = get_query_handlers(meta['converter'], meta)
+                    if handlers:
+                        self.plan.append((name, handlers, None))
+                elif 'min' in prototype.prototypes and 'max' in prototype.prototypes:
+                    handler = get_query_handlers(meta['converter'], meta).get('between')
+                    if handler:
+                        self.plan.append((name, None, handler))
+            elif meta.get('converter'):
+                handler = get_query_handlers(meta['converter'], meta).get('equals')
+                if handler:
+                    self.plan.append((name, None, handler))
+
+
+    def __call__(self, filterform):
+        filters = {}
+        fields = filterform.fields
+        for name, handlers, handler in self.plan:
+            value = fields[name].value
+            if handlers is None:
+                handler(name, value, filters)
+            else:
+                command = value['command']
+                if command:
+                    handlers[command](name, value[command], filters)
+        return filters
+
+
+translators = weakref.WeakKeyDictionary() # Form class => FilterTranslator
+
+
+def get_translator(filterform):
+    """Compiled `FilterTranslator` of the form class, recompiled if its fields were reassigned"""
+    cls = filterform.__class__
+    prototypes = filterform.prototypes
+    translator = translators.get(cls)
+    if translator is None or len(translator.prototypes) != len(prototypes) or any(
+        a is not b for a, b in zip(translator.prototypes, prototypes.values())
+    ):
+        translator = translators[cls] = FilterTranslator(prototypes)
+    return translator
 
 
 def get_filters(filterform):
-    filters = {}
+    return get_translator(filterform)(filterform)
+
+
+def get_collation(filterform):
+    """
+    `collation` argument for `find` / `count_documents` with the filters of :arg:`filterform`:
+    `meta['collation']` of its text fields in 'collation' mode (one per query), None if there are none
+    """
+    collations = []
     for name, form_field in filterform:
-        if hasattr(form_field, 'prototypes'):
-            if 'command' in form_field.prototypes:
-                command = form_field.value['command']
-                if command:
-                    value_to_query(
-                        form_field.meta['converter'], command, name, form_field.value[command], filters
-                    )
-            elif 'min' in form_field.prototypes and 'max' in form_field.prototypes:
-                value_to_query(
-                    form_field.meta['converter'], 'between', name, form_field.value, filters
-                )
-        elif form_field.meta.get('converter'):
-            value_to_query(
-                form_field.meta.get('converter'), 'equals', name, form_field.value, filters
-            )
-    return filters
+        if form_field.meta.get('text_index') == 'collation':
+            if not form_field.meta.get('collation'):
+                raise ValueError("Field {!r} in text index mode 'collation' has no `meta['collation']`".format(name))
+            if form_field.meta['collation'] not in collations:
+                collations.append(form_field.meta['collation'])
+    if len(collations) > 1:
+        raise ValueError('Fields of {!r} use different collations {!r}'.format(filterform, collations))
+    return collations[0] if collations else None
 
 
 def get_sorts(sortform):
@@ -183,3 +330,89 @@ def get_sorts(sortform):
             else:
                 raise TypeError('Invalid value type {!r} for field {!r}'.format(type(field.value), field))
     return sorts
+
+
+def get_old_value(form, path):
+    """
+    Model value at :arg:`path` before `form` was fed. `FieldField` rows are fed without model values,
+    so below the first `FieldField` the model list is walked instead
+    """
+    names = path.split('.')
+    fields = form.walk(path)
+    for i, field in enumerate(fields[1:], start=1):
+        if isinstance(field, FieldField) or i == len(fields) - 1:
+            value = field.feed_value
+            for name in names[i:]:
+                value = value[int(name)] if isinstance(value, list) else value[name]
+            return value
+
+
+def get_update(form, unset_none=True, push=True):
+    """
+    Update document for `update_one` from `form.changes()`, instead of replacing the whole document:
+    changed paths go to `$set`, cleared ones (None) to `$unset`, lists grown at the end to `$push`.
+    Empty if nothing changed
+    """
+    update = {}
+    for path, value in form.changes().items():
+        if value is None and unset_none:
+            update.setdefault('$unset', {})[path] = ''
+            continue
+        if push and isinstance(value, list) and value:
+            try:
+                old = get_old_value(form, path)
+            except (KeyError, IndexError, TypeError, ValueError):
+                old = None
+            if isinstance(old, list) and len(old) < len(value) and value[:len(old)] == old:
+                update.setdefault('$push', {})[path] = {'$each': value[len(old):]}
+                continue
+        update.setdefault('$set', {})[path] = value
+    return update
+
+
+def get_writes(forms, key='_id', upsert=False, on_invalid=None):
+    """
+    Fed forms => `bulk_write` requests: `InsertOne` of the value for forms fed without a model,
+    `UpdateOne` by the model :arg:`key` with `get_update` otherwise (nothing if unchanged).
+    Forms with errors are passed to :arg:`on_invalid` and skipped
+    """
+    for form in forms:
+        if form.has_error:
+            if on_invalid:
+                on_invalid(form)
+        elif form.feed_value is None:
+            yield InsertOne(form.value)
+        else:
+            update = get_update(form)
+            if update:
+                model = form.feed_value
+                yield UpdateOne({key: get_accessor(model.__class__).get(model, key, None)}, update, upsert=upsert)
+
+
+def bulk_write(collection, forms, batch_size=1000, ordered=True, key='_id', upsert=False, on_invalid=None):
+    """
+    Writes valid fed forms (any iterable, consumed lazily) with `collection.bulk_write` in batches
+    of :arg:`batch_size` requests, see `get_writes`. Ordered writes stop at the first failed batch:
+    its `BulkWriteError` propagates with `results` of the batches committed before it.
+    Unordered ones go on with the next batches.
+    Returns (`BulkWriteResult`s, `BulkWriteError` details of failed batches)
+    """
+    results, errors = [], []
+    batch = []
+    def flush():
+        try:
+            results.append(collection.bulk_write(batch, ordered=ordered))
+        except BulkWriteError as e:
+            if ordered:
+                e.results = results
+                raise
+            errors.append(e.details)
+    for request in get_writes(forms, key, upsert, on_invalid):
+        batch.append(request)
+        if len(batch) >= batch_size:
+            flush()
+            batch = []
+    if batch:
+        flush()
+    return results, errors
+
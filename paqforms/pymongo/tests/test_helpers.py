@@ -0,0 +1,223 @@
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from nose.tools import assert_raises
+
+from paqforms import *
+from paqforms.pymongo import *
+from paqforms.pymongo.helpers import get_translator, value_to_query, prefix_range
+
+
+class RowForm(BaseForm):
+    title = Field(None, converters=StrConverter())
+    tags = MultiChoiceField(None, choices=['a', 'b', 'c'])
+
+
+class AddressForm(BaseForm):
+    city = Field(None, converters=StrConverter())
+    zip = Field(None, converters=StrConverter())
+
+
+class OrderForm(BaseForm):
+    email = Field(None, converters=StrConverter())
+    note = Field(None, converters=StrConverter())
+    address = FormField(None, AddressForm)
+    rows = FieldField(None, FormField(None, RowForm))
+
+
+def model():
+    return {
+        'email': 'a@b.c',
+        'note': 'call first',
+        'address': {'city': 'Paris', 'zip': '75001'},
+        'rows': [{'title': 'x', 'tags': ['a']}, {'title': 'y', 'tags': ['b']}],
+    }
+
+
+def data(**changes):
+    data = {
+        'email': 'a@b.c',
+        'note': 'call first',
+        'address': {'city': 'Paris', 'zip': '75001'},
+        'rows': [{'title': 'x', 'tags': ['a']}, {'title': 'y', 'tags': ['b']}],
+    }
+    data.update(changes)
+    return data
+
+
+class Test_GetUpdate:
+    def test_unchanged(self):
+        form = OrderForm(model(), data(), submit=True)
+        assert get_update(form) == {}
+
+    def test_set_unset(self):
+        form = OrderForm(model(), data(email='d@e.f', note='', address={'city': 'Lyon', 'zip': '75001'}), submit=True)
+        assert get_update(form) == {
+            '$set': {'email': 'd@e.f', 'address.city': 'Lyon'},
+            '$unset': {'note': ''},
+        }
+        assert get_update(form, unset_none=False)['$set']['note'] is None
+
+    def test_rows(self):
+        form = OrderForm(model(), data(rows=[{'title': 'x', 'tags': ['a', 'c']}, {'title': 'z', 'tags': ['b']}]), submit=True)
+        assert get_update(form) == {
+            '$push': {'rows.0.tags': {'$each': ['c']}},
+            '$set': {'rows.1.title': 'z'},
+        }
+        assert get_update(form, push=False) == {'$set': {'rows.0.tags': ['a', 'c'], 'rows.1.title': 'z'}}
+
+    def test_push(self):
+        rows = data()['rows'] + [{'title': 'w', 'tags': []}]
+        form = OrderForm(model(), data(rows=rows), submit=True)
+        assert get_update(form) == {'$push': {'rows': {'$each': [{'title': 'w', 'tags': []}]}}}
+
+    def test_shrink(self):
+        form = OrderForm(model(), data(rows=data()['rows'][1:]), submit=True)
+        assert get_update(form) == {'$set': {'rows': [{'title': 'y', 'tags': ['b']}]}}
+
+
+class Collection:
+    """Stand-in recording `bulk_write` calls, fails batches holding a document from `failing`"""
+    def __init__(self, failing=()):
+        self.batches = []
+        self.failing = failing
+
+    def bulk_write(self, requests, ordered=True):
+        self.batches.append((list(requests), ordered))
+        if any(getattr(request, '_doc', {}).get('email') in self.failing for request in requests):
+            raise BulkWriteError({'writeErrors': [{'index': 0}], 'nInserted': 0})
+        return len(requests)
+
+
+class Test_BulkWrite:
+    def __init__(self):
+        self.new = [OrderForm(None, data(email='{}@b.c'.format(i)), submit=True) for i in range(5)]
+        self.invalid = OrderForm(None, data(rows=[{'title': 'x', 'tags': ['x']}]), submit=True)
+        self.changed = OrderForm(dict(model(), _id=7), data(email='d@e.f'), submit=True)
+        self.unchanged = OrderForm(dict(model(), _id=8), data(), submit=True)
+
+    def test_writes(self):
+        invalid = []
+        requests = list(get_writes(self.new[:1] + [self.invalid, self.changed, self.unchanged], on_invalid=invalid.append))
+        assert requests == [InsertOne(self.new[0].value), UpdateOne({'_id': 7}, {'$set': {'email': 'd@e.f'}}, upsert=False)]
+        assert invalid == [self.invalid]
+
+    def test_batches(self):
+        collection = Collection()
+        results, errors = bulk_write(collection, iter(self.new + [self.changed]), batch_size=2)
+        assert [len(requests) for requests, ordered in collection.batches] == [2, 2, 2]
+        assert results == [2, 2, 2] and errors == []
+        assert all(ordered for requests, ordered in collection.batches)
+
+    def test_ordered(self):
+        collection = Collection(failing=['2@b.c'])
+        with assert_raises(BulkWriteError) as context:
+            bulk_write(collection, self.new, batch_size=2)
+        assert len(collection.batches) == 2
+        assert context.exception.results == [2]
+
+    def test_unordered(self):
+        collection = Collection(failing=['2@b.c'])
+        results, errors = bulk_write(collection, self.new, batch_size=2, ordered=False)
+        assert len(collection.batches) == 3 and not any(ordered for requests, ordered in collection.batches)
+        assert results == [2, 1] and errors == [{'writeErrors': [{'index': 0}], 'nInserted': 0}]
+
+
+class Test_TextFilters:
+    def filters(self, meta, command, value):
+        class SearchForm(BaseForm):
+            title = FilterTextField('Title', meta=meta)
+
+        form = SearchForm({}, {'title': {'command': command, command: value}}, submit=True)
+        return get_filters(form), get_collation(form)
+
+    def test_default(self):
+        assert self.filters({}, 'starts_with', 'a.b') == ({'title': {'$regex': '^a\\.b', '$options': 'i'}}, None)
+        assert self.filters({}, 'contains', '(x') == ({'title': {'$regex': '\\(x', '$options': 'i'}}, None)
+
+    def test_prefix(self):
+        assert self.filters({'text_index': 'prefix'}, 'starts_with', 'Ab*') == ({'title': {'$regex': '^Ab\\*'}}, None)
+
+    def test_shadow(self):
+        assert self.filters({'text_index': 'shadow'}, 'starts_with', 'Abc') == ({'title_lower': {'$gte': 'abc', '$lt': 'abd'}}, None)
+        assert self.filters({'text_index': 'shadow', 'shadow': 'norm.title'}, 'equals', 'Abc') == ({'norm.title': 'abc'}, None)
+        assert self.filters({'text_index': 'shadow'}, 'empty', 'yes') == ({'title': None}, None)
+
+    def test_collation(self):
+        collation = {'locale': 'en', 'strength': 2}
+        assert self.filters({'text_index': 'collation', 'collation': collation}, 'equals', 'Abc') == ({'title': 'Abc'}, collation)
+        assert self.filters({'text_index': 'collation', 'collation': collation}, 'starts_with', 'Ab') == ({'title': {'$gte': 'Ab', '$lt': 'Ac'}}, collation)
+        with assert_raises(ValueError):
+            self.filters({'text_index': 'collation'}, 'equals', 'Abc')
+
+    def test_prefix_range(self):
+        assert prefix_range('ab') == {'$gte': 'ab', '$lt': 'ac'}
+        assert prefix_range('a\ud7ff') == {'$gte': 'a\ud7ff', '$lt': 'a\ue000'} # Skips surrogates
+        assert prefix_range('a\U0010ffff') == {'$gte': 'a\U0010ffff', '$lt': 'b'}
+        assert prefix_range('a\U0010ffff\U0010ffff') == {'$gte': 'a\U0010ffff\U0010ffff', '$lt': 'b'}
+        assert prefix_range('\U0010ffff') == {'$gte': '\U0010ffff'}
+
+    def test_invalid_mode(self):
+        with assert_raises(ValueError):
+            self.filters({'text_index': 'fulltext'}, 'equals', 'Abc')
+
+
+class Test_FilterTranslator:
+    def __init__(self):
+        class SearchForm(BaseForm):
+            title = FilterTextField('Title', meta={'text_index': 'prefix'})
+            price = FilterIntField('Price')
+            size = BetweenIntField('Size')
+            kind = Field(None, converters=StrConverter(), meta={'converter': StrConverter()})
+            note = Field(None, converters=StrConverter())
+
+        self.SearchForm = SearchForm
+
+    def test_filters(self):
+        form = self.SearchForm({}, {
+            'title': {'command': 'starts_with', 'starts_with': 'Ab'},
+            'price': {'command': 'between', 'between': {'min': '10', 'max': '20'}},
+            'size': {'min': '', 'max': '5'},
+            'kind': 'x',
+            'note': 'y',
+        }, submit=True)
+        assert get_filters(form) == {
+            'title': {'$regex': '^Ab'},
+            'price': {'$gte': 10, '$lte': 20},
+            'size': {'$lte': 5},
+            'kind': 'x',
+        }
+        assert [name for name, handlers, handler in get_translator(form).plan] == ['title', 'price', 'size', 'kind']
+
+    def test_cached(self):
+        form = self.SearchForm({}, {})
+        translator = get_translator(form)
+        assert get_translator(self.SearchForm({}, {})) is translator
+        self.SearchForm.kind = Field(None, converters=IntConverter(), meta={'converter': IntConverter()})
+        form = self.SearchForm({}, {'kind': '0'}, submit=True)
+        assert get_translator(form) is not translator
+        assert get_filters(form) == {'kind': 0}
+
+    def test_value_to_query(self):
+        filters = {}
+        value_to_query(IntConverter(), 'not_equals', 'price', 5, filters)
+        value_to_query(object(), 'equals', 'other', 5, filters)
+        assert filters == {'price': {'$ne': 5}}
+
+    def test_register(self):
+        class CodeConverter(StrConverter):
+            pass
+
+        @value_to_query.register(CodeConverter)
+        def _(converter, command, name, value, filters, meta={}):
+            if value:
+                filters[name] = {'$in': [value, value.upper()]}
+
+        class CodeForm(BaseForm):
+            code = Field(None, converters=CodeConverter(), meta={'converter': CodeConverter()})
+            title = FilterTextField('Title')
+
+        form = CodeForm({}, {'code': 'ab', 'title': {'command': 'equals', 'equals': 'x'}}, submit=True)
+        assert get_filters(form) == {'code': {'$in': ['ab', 'AB']}, 'title': 'x'}
+        filters = {}
+        value_to_query(CodeConverter(), 'equals', 'code', 'cd', filters)
+        assert filters == {'code': {'$in': ['cd', 'CD']}}
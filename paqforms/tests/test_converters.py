@@ -295,6 +295,41 @@ class _Test_MapConverter:
         assert converter.format([1, 0, 1]) == ['1', '0', '1']
 
 
+class Test_ParseJSON:
+    """
+    JSON data is typed already: no stripping, no locale-aware number parsing
+    """
+    def test_str(self):
+        converter = StrConverter()
+        assert converter.parse_json(' xyz ') == ' xyz '
+        assert converter.parse_json('') is None
+        assert converter.parse_json(None) is None
+        assert_raises(TypeError, converter.parse_json, 1)
+
+
+    def test_bool(self):
+        converter = BoolConverter(none=False)
+        assert converter.parse_json(True) is True
+        assert converter.parse_json(None) is False
+        assert converter.parse_json('1') is True
+
+
+    def test_numbers(self):
+        assert IntConverter().parse_json(125) == 125
+        assert IntConverter().parse_json('1000', 'ru') == 1000
+        assert_raises(ValueError, IntConverter().parse_json, '1,000')
+        assert FloatConverter().parse_json(1) == 1.0
+        assert FloatConverter().parse_json('1000.5', 'ru') == 1000.5
+        assert DecimalConverter().parse_json('1000.02', 'ru') == decimal.Decimal('1000.02')
+        assert DecimalConverter().parse_json(2) == decimal.Decimal(2)
+
+
+    def test_map(self):
+        converter = MapConverter(converter=StrConverter())
+        assert converter.parse_json([' a ', 'b']) == [' a ', 'b']
+        assert converter.parse_json(None) == []
+
+
 class Test_Converters:
     def test_parse(self):
         data = 'JAC,Came,back'
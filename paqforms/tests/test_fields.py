@@ -1,3 +1,9 @@
+import sys
+import copy
+import json
+import time
+import asyncio
+import contextvars
 import decimal
 import datetime
 import babel.support; nt = babel.support.NullTranslations()
@@ -7,11 +13,14 @@ from werkzeug.datastructures import MultiDict
 from unittest.mock import Mock
 from nose.tools import assert_raises
 
+import paqforms.fields
+
 from paqforms.converters import *
 from paqforms.helpers import *
 from paqforms.validators import *
 from paqforms.fields import Field, FieldField, FormField
 from paqforms.fields import *
+from paqforms.bootstrap.widgets import TextWidget
 
 
 class Post:
@@ -913,6 +922,52 @@ class Test_Form:
         assert MyForm.prototypes['demox'].required
         assert not CloneForm.prototypes['demox'].required
 
+    def test_feed_flat(self):
+        class CommentForm(BaseForm):
+            content = Field(None)
+
+        class PostForm(BaseForm):
+            content = Field(None)
+            comments = FieldField(None, FormField('', prototypes=CommentForm))
+            tags = FieldField(None, Field(None))
+
+        data = MultiDict([
+            ('content', 'post-content-1'),
+            ('comments-1.content', 'comment-content-1'),
+            ('comments-2.content', 'comment-content-2'),
+            ('tags-1', 'tag-1'),
+            ('tags-2', 'tag-2'),
+            ('tags-3', 'tag-3'),
+        ])
+        form = PostForm({})
+        form.feed_flat({}, data, submit=True)
+        assert form.value == PostForm({}, data=variable_decode(data), submit=True).value == {
+            'content': 'post-content-1',
+            'comments': [{'content': 'comment-content-1'}, {'content': 'comment-content-2'}],
+            'tags': ['tag-1', 'tag-2', 'tag-3'],
+        }
+
+        # named forms look up their own prefix
+        form = PostForm({}, name='post')
+        form.feed_flat({}, MultiDict([('post.content', 'x'), ('post.tags-1', 'y')]), submit=True)
+        assert form.value == {'content': 'x', 'comments': [], 'tags': ['y']}
+
+    def test_feed_json(self):
+        class TestForm(BaseForm):
+            a = Field(None, converters=StrConverter())
+            b = Field(None, converters=IntConverter())
+            c = Field(None, converters=BoolConverter(none=False))
+
+        form = TestForm({}, data={'a': ' x ', 'b': 1000, 'c': True}, submit=True, json=True)
+        assert form.json
+        assert form.fields['b'].json
+        assert form.value == {'a': ' x ', 'b': 1000, 'c': True}
+
+        form = TestForm({}, locale='ru')
+        form.feed_json({}, {'a': 'x', 'b': '1000', 'c': False}, submit=True)
+        assert form.value == {'a': 'x', 'b': 1000, 'c': False}
+        assert not form.json
+
 
 class Test_FlaskForm:
     def test(self):
@@ -957,6 +1012,648 @@ class Test_FlaskForm:
         }
 
 
+class AsyncIntConverter(IntConverter):
+    async def parse(self, data, locale='en'):
+        await asyncio.sleep(0)
+        return IntConverter.parse(self, data, locale)
+
+
+class Test_FeedAsync:
+    def test_same_as_sync(self):
+        class CommentForm(BaseForm):
+            content = Field(None, required=True, converters=StrConverter())
+            rating = Field(None, converters=IntConverter(), validators=ValueValidator(min=1))
+
+        class PostForm(BaseForm):
+            content = Field(None, required=True, converters=StrConverter())
+            comments = FieldField(None, FormField('', prototypes=CommentForm))
+            tags = FieldField(None, Field(None, converters=StrConverter(), validators=LengthValidator(max=3)))
+            kind = ChoiceField(None, choices=['a', 'b'])
+
+        data = {
+            'content': '',
+            'comments': [{'content': 'x', 'rating': '0'}, {'content': '', 'rating': 'y'}, {'content': 'z', 'rating': '5'}],
+            'tags': ['tag-1', 'tag'],
+            'kind': 'c',
+        }
+        form = PostForm({}, data, submit=True)
+        async_form = PostForm({})
+        assert asyncio.run(async_form.feed_async({}, data, submit=True)) is async_form
+        assert async_form.value == form.value
+        assert async_form.messages == form.messages
+        assert repr(async_form.messages) == repr(form.messages) # same ordering
+        assert list(async_form.fields) == list(form.fields)
+
+        model = {'content': 'post', 'comments': [{'content': 'x', 'rating': 1}], 'tags': ['t'], 'kind': 'a'}
+        asyncio.run(async_form.feed_async(model))
+        assert async_form.value == PostForm(model).value
+
+    def test_async_converters_and_validators(self):
+        running = {'now': 0, 'max': 0}
+
+        async def unique(value, field):
+            running['now'] += 1
+            running['max'] = max(running['max'], running['now'])
+            await asyncio.sleep(0.01)
+            running['now'] -= 1
+            return value != 'taken'
+
+        async def choices():
+            return ['a', 'b']
+
+        class TestForm(BaseForm):
+            login = Field(None, converters=StrConverter(), validators=CallbackValidator(unique, 'Taken'))
+            email = Field(None, converters=StrConverter(), validators=CallbackValidator(unique, 'Taken'))
+            age = Field(None, converters=AsyncIntConverter())
+            kind = ChoiceField(None, choices=choices)
+
+        form = TestForm({})
+        asyncio.run(form.feed_async({}, {'login': 'taken', 'email': 'free', 'age': '10', 'kind': 'c'}, submit=True))
+        assert running['max'] == 2
+        assert form.messages['login'] == {'error': ['Taken']}
+        assert form.messages['email'] == {}
+        assert form.value['age'] == 10
+        assert form.messages['kind'] == {'error': ["Invalid value 'c' for defined `choices`"]}
+
+        asyncio.run(form.feed_async({}, {'login': 'x', 'email': 'y', 'age': 'z', 'kind': 'a'}, submit=True))
+        assert form.messages['age'] == {'error': ['Invalid value']}
+        assert not form.messages['kind']
+
+    def test_dependent_fields(self):
+        class AsyncStrConverter(StrConverter):
+            async def parse(self, data, locale='en'):
+                await asyncio.sleep(0.01)
+                return StrConverter.parse(self, data, locale)
+
+        def make_form(converter):
+            class SignupForm(BaseForm):
+                password = Field(TextWidget('Password'), converters=converter)
+                password2 = Field(TextWidget('Repeat'), converters=StrConverter(), validators=RepeatValidator('password', 'Mismatch'))
+                login = Field(TextWidget('Login'), converters=StrConverter())
+            return SignupForm
+
+        SignupForm, AsyncSignupForm = make_form(StrConverter()), make_form(AsyncStrConverter())
+        assert paqforms.fields.get_feed_stages(AsyncSignupForm.prototypes) == [['password', 'login'], ['password2']]
+        for data in [{'password': 'x', 'password2': 'x'}, {'password': 'x', 'password2': 'y'}]:
+            form = SignupForm({}, data, submit=True)
+            async_form = AsyncSignupForm({})
+            asyncio.run(async_form.feed_async({}, data, submit=True))
+            assert async_form.value == form.value
+            assert async_form.messages == form.messages
+        assert async_form.messages['password2'] == {'error': ['Mismatch']}
+
+
+    def test_sync_override(self):
+        class TestForm(BaseForm):
+            password = Field(None, converters=StrConverter())
+            repassword = Field(None, converters=StrConverter())
+
+            def validate_value(self, value):
+                if value['password'] != value['repassword']:
+                    raise ValidationError('Passwords differ')
+
+        form = TestForm({})
+        asyncio.run(form.feed_async({}, {'password': 'a', 'repassword': 'b'}, submit=True))
+        assert form.messages['error'] == ['Passwords differ']
+
+    def test_sync_override_of_subclass(self):
+        class MyChoice(ChoiceField):
+            def validate_value(self, value):
+                ChoiceField.validate_value(self, value)
+                if value == 'b':
+                    raise ValidationError('b is banned')
+
+        class TestForm(BaseForm):
+            kind = MyChoice(None, choices=['a', 'b'])
+
+        form = TestForm({}, {'kind': 'b'}, submit=True)
+        assert form.messages['kind'] == {'error': ['b is banned']}
+        form = TestForm({})
+        asyncio.run(form.feed_async({}, {'kind': 'b'}, submit=True))
+        assert form.messages['kind'] == {'error': ['b is banned']}
+        asyncio.run(form.feed_async({}, {'kind': 'c'}, submit=True))
+        assert form.messages['kind'] == {'error': ["Invalid value 'c' for defined `choices`"]}
+
+
+class Test_Prefetch:
+    def __init__(self):
+        self.calls = calls = []
+
+        def colors():
+            calls.append('colors')
+            time.sleep(0.05)
+            return iter(['red', 'green'])
+
+        def sizes():
+            calls.append('sizes')
+            time.sleep(0.05)
+            return ['s', 'm']
+
+        class RowForm(BaseForm):
+            size = ChoiceField('Size', choices=sizes)
+
+        class ProductForm(BaseForm):
+            color = ChoiceField('Color', choices=colors)
+            tags = MultiChoiceField('Tags', choices=['a', 'b'])
+            rows = FieldField('Rows', FormField('Row', RowForm))
+
+        self.ProductForm = ProductForm
+        self.data = {'color': 'red', 'tags': ['a'], 'rows': [{'size': 's'}, {'size': 'x'}]}
+
+    def test_prefetch(self):
+        form = self.ProductForm(None)
+        start = time.perf_counter()
+        form.prefetch()
+        assert time.perf_counter() - start < 0.09 # concurrently
+        assert sorted(self.calls) == ['colors', 'sizes']
+        assert list(form.prefetch_timings) == ['color', 'rows.size']
+        assert all(seconds >= 0.05 for seconds in form.prefetch_timings.values())
+
+        form.feed(None, self.data, submit=True)
+        form()
+        assert sorted(self.calls) == ['colors', 'sizes']
+        assert form.fields['color'].choices() == ['red', 'green']
+        assert not form.fields['rows'].fields[0].has_error
+        assert form.fields['rows'].fields[1].has_error
+
+    def test_init(self):
+        form = self.ProductForm(None, self.data, submit=True, prefetch=True)
+        assert sorted(self.calls) == ['colors', 'sizes']
+        assert form.fields['rows'].fields[1].has_error
+
+    def test_prefetch_async(self):
+        async def weights():
+            self.calls.append('weights')
+            await asyncio.sleep(0.05)
+            return ['1', '2']
+
+        class WeightedForm(self.ProductForm):
+            weight = ChoiceField(None, choices=weights)
+
+        async def main():
+            form = WeightedForm(None)
+            start = time.perf_counter()
+            await form.prefetch_async()
+            assert time.perf_counter() - start < 0.09
+            await form.feed_async(None, dict(self.data, weight='3'), submit=True)
+            return form
+
+        form = asyncio.run(main())
+        assert sorted(self.calls) == ['colors', 'sizes', 'weights']
+        assert list(form.prefetch_timings) == ['color', 'rows.size', 'weight']
+        assert form.fields['weight'].has_error
+
+    def test_context(self):
+        request = contextvars.ContextVar('request')
+        class UserForm(BaseForm):
+            role = ChoiceField('Role', choices=lambda: ['admin'] if request.get() == 'admin' else ['user'])
+
+        request.set('admin')
+        form = UserForm(None)
+        form.prefetch()
+        assert form.fields['role'].choices() == ['admin']
+        form = UserForm(None)
+        asyncio.run(form.prefetch_async())
+        assert form.fields['role'].choices() == ['admin']
+
+
+    def test_without_prefetch(self):
+        form = self.ProductForm(None, self.data, submit=True)
+        assert self.calls.count('sizes') == 2 # once per row
+
+
+class Test_Fingerprint:
+    def __init__(self):
+        class RowForm(BaseForm):
+            title = Field(None, converters=StrConverter())
+            amount = Field(None, converters=IntConverter())
+
+        class OrderForm(BaseForm):
+            name = Field(None, converters=StrConverter(), required=True)
+            rows = FieldField(None, FormField(None, RowForm))
+
+        self.OrderForm = OrderForm
+        self.data = {'name': 'order', 'rows': [{'title': 'a', 'amount': '1'}, {'title': 'b', 'amount': '2'}]}
+
+    def test_stable(self):
+        form = self.OrderForm(None, self.data, submit=True)
+        assert len(form.fingerprint) == 16
+        assert form.fingerprint == self.OrderForm(None, self.data, submit=True).fingerprint
+        assert form.fingerprint == self.OrderForm({'name': 'order', 'rows': [{'title': 'a', 'amount': 1}, {'title': 'b', 'amount': 2}]}).fingerprint
+        assert form.etag == '"{}"'.format(form.fingerprint)
+
+    def test_changes(self):
+        form = self.OrderForm(None, self.data, submit=True)
+        fingerprint, rows = form.fingerprint, form.fields['rows'].fingerprint
+        form.feed(None, dict(self.data, name='other'), submit=True)
+        assert form.fingerprint != fingerprint
+        assert form.fields['rows'].fingerprint == rows
+        fingerprints = {
+            self.OrderForm(None, dict(self.data, rows=[{'title': 'a', 'amount': 'x'}]), submit=True).fingerprint,
+            self.OrderForm(None, dict(self.data, rows=[{'title': 'a', 'amount': 'y'}]), submit=True).fingerprint,
+            self.OrderForm(None, dict(self.data, name=''), submit=True).fingerprint,
+            self.OrderForm(None, self.data, submit=True, locale='ru').fingerprint,
+            self.OrderForm(None, self.data, submit=True, meta={'version': 2}).fingerprint,
+            fingerprint,
+        }
+        assert len(fingerprints) == 6
+
+    def test_feed_async(self):
+        form = self.OrderForm(None)
+        asyncio.run(form.feed_async(None, self.data, submit=True))
+        assert form.fingerprint == self.OrderForm(None, self.data, submit=True).fingerprint
+
+
+class Test_Slots:
+    def test_bound(self):
+        class RowForm(BaseForm):
+            title = Field(None, converters=StrConverter())
+            rows = FieldField(None, FormField(None, [Field(None, name='x')]))
+
+        form = RowForm(None, {'title': 'a', 'rows': [{'x': '1'}, {'x': '2'}]}, submit=True)
+        title, rows = form.fields['title'], form.fields['rows']
+        assert title.__dict__ == RowForm.prototypes['title'].__dict__
+        assert 'value' not in title.__dict__ and 'messages' not in title.__dict__
+        assert rows.fields[0].fields['x'].meta is rows.fields[1].fields['x'].meta
+        assert (rows.fields[0].fields['x'].value, rows.fields[1].fields['x'].value) == ('1', '2')
+        assert sys.getsizeof(title) < sys.getsizeof(title.__dict__)
+        assert rows.fields[1].fields['x'].fullname == 'rows-2.x'
+
+    def test_isolated(self):
+        class F(BaseForm):
+            name = Field(None, converters=StrConverter())
+            cat = ChoiceField(None, choices=['a', 'b'])
+
+        f1 = F(None, {'name': '', 'cat': 'a'}, submit=True)
+        f1.fields['cat'].choices = lambda: ['x']
+        f1.fields['name'].required = lambda: True
+        f1.fields['name'].validators = [LengthValidator(min=5)]
+        with assert_raises(TypeError):
+            f1.fields['name'].meta['renderer'] = 'python'
+        f1.fields['name'].meta = dict(f1.fields['name'].meta, renderer='python')
+        f2 = F(None, {'name': '', 'cat': 'a'}, submit=True)
+        assert not f2.has_error
+        assert f2.fields['cat'].choices() == ['a', 'b'] and not f2.fields['name'].required()
+        assert f2.fields['name'].renderer is None and not F.prototypes['name'].validators
+
+    def test_prototype_meta(self):
+        class F(BaseForm):
+            name = Field(None, converters=StrConverter(), meta={'label': 'a'})
+            other = Field(None, converters=StrConverter())
+
+        f1 = F(None)
+        F.prototypes['name'].meta['label'] = 'b'
+        F.prototypes['other'].meta['label'] = 'c'
+        assert F.prototypes['name'].meta.__class__ is dict
+        assert f1.fields['name'].meta['label'] == 'b' and F(None).fields['other'].meta['label'] == 'c'
+        with assert_raises(TypeError):
+            f1.fields['other'].meta['label'] = 'd'
+        assert F.prototypes['other'].meta == {'label': 'c'}
+
+    def test_nested_json(self):
+        class InnerForm(BaseForm):
+            number = Field(None, converters=IntConverter())
+
+        class OuterForm(BaseForm):
+            inner = FormField(None, InnerForm)
+
+        form = OuterForm(None)
+        inner = form.fields['inner']
+        inner.feed_json(None, {'number': 1}, submit=True)
+        assert inner.value == {'number': 1}
+        assert not inner.json and 'json' not in inner.__dict__ and '_json' not in inner.__dict__
+
+
+class Test_Messages:
+    def __init__(self):
+        class RowForm(BaseForm):
+            title = Field(None, converters=StrConverter())
+            amount = Field(None, converters=IntConverter())
+
+        class OrderForm(BaseForm):
+            name = Field(None, converters=StrConverter())
+            rows = FieldField(None, FormField(None, RowForm))
+
+        self.OrderForm = OrderForm
+
+    def test_valid(self):
+        form = self.OrderForm(None, {'name': 'order', 'rows': [{'title': 'a', 'amount': '1'}]}, submit=True)
+        name = form.fields['name']
+        assert name.messages is EMPTY_MESSAGES and form.fields['rows'].fields[0].fields['title'].messages is EMPTY_MESSAGES
+        assert name.messages == {} and not name.has_error
+        assert_raises(TypeError, name.messages.__setitem__, 'error', ['x'])
+        assert copy.deepcopy(name.messages) == {} and name.messages.copy() == {}
+        assert not form.has_error and not form._messages_merged
+        assert form.messages == {'name': {}, 'rows': {0: {'title': {}, 'amount': {}}}}
+        assert json.dumps(form.messages) == '{"name": {}, "rows": {"0": {"title": {}, "amount": {}}}}'
+
+    def test_invalid(self):
+        form = self.OrderForm(None, {'name': 'order', 'rows': [{'title': 'a', 'amount': '1'}, {'title': 'b', 'amount': 'x'}]}, submit=True)
+        assert form.has_error and form.fields['rows'].has_error
+        assert form.messages['rows'][1] == {'title': {}, 'amount': {'error': ['Invalid value']}}
+        assert form.messages['rows'] is form.fields['rows'].messages
+
+    def test_assign(self):
+        form = self.OrderForm(None, {'name': 'order'}, submit=True)
+        form.messages['error'] = ['Order is closed']
+        assert form.has_error and form.messages['error'] == ['Order is closed'] and 'name' in form.messages
+        form.fields['name'].messages = {'warning': ['Check it']}
+        assert form.fields['name'].has_warning
+        form.messages = {'info': ['Replaced']}
+        assert form.has_info and form.messages == {'info': ['Replaced']}
+
+
+class Test_ValidationOrder:
+    def __init__(self):
+        self.calls = calls = []
+
+        def lookup(value, field):
+            calls.append(value)
+            return True
+
+        class UserForm(BaseForm):
+            login = Field(None, converters=StrConverter(), validators=[CallbackValidator(lookup), RegexValidator(r'^\w+$'), LengthValidator(max=5)])
+
+        self.UserForm = UserForm
+
+    def test_declared(self):
+        form = self.UserForm(None, {'login': 'too long'}, submit=True)
+        assert self.calls == ['too long']
+        assert form.messages['login']['error'] == ['Invalid input']
+
+    def test_cost(self):
+        form = self.UserForm(None, {'login': 'too long'}, submit=True, meta={'validation_order': 'cost'})
+        assert self.calls == []
+        assert form.messages['login']['error'] == ['Length > 5']
+        prototype = self.UserForm.prototypes['login']
+        assert [validator.cost for validator in form.fields['login'].get_validators()] == [CHEAP, MODERATE, EXPENSIVE]
+        assert prototype.get_validators() == prototype.validators # Own meta: declared order
+        form = self.UserForm(None, {'login': 'short'}, submit=True, meta={'validation_order': 'cost'})
+        assert self.calls == ['short'] and not form.has_error
+
+    def test_costs(self):
+        assert MapValidator(LengthValidator()).cost == CHEAP
+        assert CallbackValidator(bool, cost=CHEAP).cost == CHEAP
+        assert EmailValidator().cost == MODERATE
+
+
+class Test_MaxErrors:
+    def __init__(self):
+        class RowForm(BaseForm):
+            amount = Field(None, converters=IntConverter())
+
+        class OrderForm(BaseForm):
+            meta = {'max_errors': 2}
+            number = Field(None, converters=IntConverter())
+            rows = FieldField(None, FormField(None, RowForm))
+            total = Field(None, converters=IntConverter())
+
+        self.OrderForm = OrderForm
+        self.data = {'number': 'x', 'rows': [{'amount': '1'}, {'amount': 'y'}, {'amount': 'z'}], 'total': 'w'}
+
+    def count_errors(self, messages):
+        return sum(self.count_errors(value) if isinstance(value, dict) else key == 'error' for key, value in messages.items())
+
+    def test_fail_fast(self):
+        form = self.OrderForm({'total': 10}, self.data, submit=True)
+        assert self.count_errors(form.messages) == 2
+        assert form.has_error and form.fields['number'].has_error and form.fields['rows'].fields[1].has_error
+        assert not form.fields['rows'].fields[2].has_error and not form.fields['total'].has_error
+        assert form.fields['total'].value == 10
+        assert paqforms.fields.error_budget.get() is None
+
+    def test_unlimited(self):
+        form = self.OrderForm({}, self.data, submit=True, meta={'max_errors': None})
+        assert self.count_errors(form.messages) == 4
+
+    def test_feed_async(self):
+        form = self.OrderForm(None)
+        asyncio.run(form.feed_async(None, self.data, submit=True))
+        assert self.count_errors(form.messages) == 2
+
+
+class Test_CrossValidators:
+    def __init__(self):
+        self.calls = []
+
+        def log(name, result):
+            def check(*values):
+                self.calls.append((name, values))
+                return result(*values)
+            return check
+
+        class PeriodForm(BaseForm):
+            start = Field(None, converters=IntConverter())
+            end = Field(None, converters=IntConverter())
+            cross_validators = [
+                CrossValidator(['start', 'end'], log('order', lambda start, end: start <= end), 'Start after end'),
+                CrossValidator('end', log('bound', lambda end: end < 100), 'Too late', target='end'),
+            ]
+
+        class BookingForm(PeriodForm):
+            period = FormField(None, PeriodForm)
+            cross_validators = [
+                CrossValidator(['end', 'period.start'], log('gap', lambda end, start: end < start), 'Overlap', target='period.start'),
+            ]
+
+        self.PeriodForm = PeriodForm
+        self.BookingForm = BookingForm
+
+    def test_order(self):
+        assert [v.message for v in self.PeriodForm.cross_validators] == ['Too late', 'Start after end']
+        assert [v.message for v in self.BookingForm.cross_validators] == ['Too late', 'Start after end', 'Overlap']
+
+    def test_cycle(self):
+        with assert_raises(ValueError):
+            class CycleForm(BaseForm):
+                a = Field(None)
+                b = Field(None)
+                cross_validators = [
+                    CrossValidator('a', lambda a: a, target='b'),
+                    CrossValidator('b', lambda b: b, target='a'),
+                ]
+
+    def test_valid(self):
+        form = self.PeriodForm({}, {'start': '1', 'end': '2'}, submit=True)
+        assert not form.has_error
+        assert [name for name, values in self.calls] == ['bound', 'order']
+        assert self.calls[1] == ('order', (1, 2))
+
+    def test_form_error(self):
+        form = self.PeriodForm({}, {'start': '3', 'end': '2'}, submit=True)
+        assert form.messages['error'] == ['Start after end']
+        assert not form.fields['end'].has_error
+
+    def test_target_error_skips_dependents(self):
+        form = self.PeriodForm({}, {'start': '300', 'end': '200'}, submit=True)
+        assert form.messages['end'] == {'error': ['Too late']}
+        assert 'error' not in form.messages
+        assert [name for name, values in self.calls] == ['bound']
+
+    def test_skipped_on_field_errors(self):
+        form = self.PeriodForm({}, {'start': 'x', 'end': '2'}, submit=True)
+        assert form.messages['start']['error'] and 'error' not in form.messages
+        assert [name for name, values in self.calls] == ['bound']
+
+    def test_not_submitted(self):
+        form = self.PeriodForm({'start': 3, 'end': 2})
+        assert not form.has_error and not self.calls
+
+    def test_missing_input(self):
+        class OrderForm(BaseForm):
+            total = Field(None, converters=IntConverter())
+            rows = FieldField(None, FormField(None, [Field(None, converters=IntConverter(), name='amount')]))
+            cross_validators = [
+                CrossValidator(['total', 'rows.0.amount'], lambda total, amount: total >= amount, 'Too small'),
+                CrossValidator('total', lambda total: total > 0, 'Not positive', target='rows.0.amount'),
+            ]
+
+        form = OrderForm({}, {'total': '1', 'rows': []}, submit=True)
+        assert 'error' not in form.messages
+        form = OrderForm({}, {'total': '1', 'rows': [{'amount': '2'}]}, submit=True)
+        assert form.messages['error'] == ['Too small']
+        form = OrderForm({}, {'total': '0', 'rows': []}, submit=True)
+        assert form.messages['error'] == ['Not positive']
+        form.revalidate('total', '5')
+        assert 'error' not in form.messages
+
+    def test_nested(self):
+        form = self.BookingForm({}, {'start': '1', 'end': '5', 'period': {'start': '3', 'end': '4'}}, submit=True)
+        assert form.messages['period']['start'] == {'error': ['Overlap']}
+        assert form.fields['period'].has_error and not form.fields['period'].fields['end'].has_error
+        form = self.BookingForm({}, {'start': '1', 'end': '5', 'period': {'start': '6', 'end': '7'}}, submit=True)
+        assert not form.has_error
+
+    def test_feed_async(self):
+        async def later(start, end):
+            return start <= end
+
+        class AsyncForm(BaseForm):
+            start = Field(None, converters=IntConverter())
+            end = Field(None, converters=IntConverter())
+            cross_validators = [CrossValidator(['start', 'end'], later, 'Start after end')]
+
+        form = AsyncForm(None)
+        asyncio.run(form.feed_async(None, {'start': '3', 'end': '2'}, submit=True))
+        assert form.messages['error'] == ['Start after end']
+
+
+class Test_Revalidate:
+    def __init__(self):
+        self.calls = []
+
+        def choices():
+            self.calls.append('choices')
+            return ['a', 'b']
+
+        class AccountForm(BaseForm):
+            kind = ChoiceField(None, choices=choices)
+            password = Field(TextWidget('Password'), converters=StrConverter())
+            repassword = Field(TextWidget('Repeat'), converters=StrConverter(), validators=RepeatValidator('password', 'Mismatch'))
+            start = Field(None, converters=IntConverter())
+            end = Field(None, converters=IntConverter())
+            rows = FieldField(None, Field(None, converters=IntConverter()))
+            cross_validators = [
+                CrossValidator(['start', 'end'], lambda start, end: start <= end, 'Start after end'),
+                CrossValidator('end', lambda end: end < 100, 'Too late', target='end'),
+            ]
+
+        self.form = AccountForm({}, {
+            'kind': 'a', 'password': 'x', 'repassword': 'x', 'start': '1', 'end': '2', 'rows': ['1', '2'],
+        }, submit=True)
+        self.calls.clear()
+
+    def test_field(self):
+        form = self.form
+        etag = form.etag
+        field = form.revalidate('start', 'y')
+        assert field is form.fields['start']
+        assert form.messages['start']['error'] and form.has_error
+        assert form.etag != etag
+        assert not self.calls
+        form.revalidate('start', '3')
+        assert form.value['start'] == 3
+        assert not form.fields['start'].has_error
+        assert form.messages['error'] == ['Start after end']
+
+    def test_dependents(self):
+        form = self.form
+        form.revalidate('password', 'z')
+        assert form.messages['repassword'] == {'error': ['Mismatch']}
+        form.revalidate('repassword', 'z')
+        assert not form.has_error
+
+    def test_cross_errors_cleared(self):
+        form = self.form
+        form.revalidate('end', '200')
+        assert form.messages['end'] == {'error': ['Too late']}
+        assert 'error' not in form.messages
+        form.revalidate('end', '0')
+        assert not form.fields['end'].has_error
+        assert form.messages['error'] == ['Start after end']
+        form.revalidate('start', '0')
+        assert not form.has_error
+
+    def test_list_item(self):
+        form = self.form
+        form.revalidate('rows.1', '5')
+        assert form.value['rows'] == [1, 5]
+        form.revalidate('rows.0', 'x')
+        assert form.messages['rows'][0]['error'] and form.has_error
+
+
+class Test_Changes:
+    def __init__(self):
+        class RowForm(BaseForm):
+            title = Field(None, converters=StrConverter())
+            amount = Field(None, converters=IntConverter())
+
+        class AddressForm(BaseForm):
+            city = Field(None, converters=StrConverter())
+            zip = Field(None, converters=StrConverter())
+
+        class OrderForm(BaseForm):
+            email = Field(None, converters=StrConverter())
+            address = FormField(None, AddressForm)
+            rows = FieldField(None, FormField(None, RowForm))
+
+        self.OrderForm = OrderForm
+
+    def model(self):
+        return {
+            'email': 'a@b.c',
+            'address': {'city': 'Paris', 'zip': '75001'},
+            'rows': [{'title': 'x', 'amount': 1}, {'title': 'y', 'amount': 2}],
+        }
+
+    def test_untouched(self):
+        form = self.OrderForm(self.model())
+        assert form.changes() == {}
+
+    def test_unchanged(self):
+        form = self.OrderForm(self.model(), {
+            'email': 'a@b.c', 'address': {'city': 'Paris', 'zip': '75001'}, 'rows': [{'title': 'x', 'amount': '1'}, {'title': 'y', 'amount': '2'}],
+        }, submit=True)
+        assert form.changes() == {}
+
+    def test_paths(self):
+        form = self.OrderForm(self.model(), {
+            'email': 'd@e.f', 'address': {'city': 'Paris', 'zip': '75002'}, 'rows': [{'title': 'x', 'amount': '1'}, {'title': 'y', 'amount': '3'}],
+        }, submit=True)
+        assert form.changes() == {'email': 'd@e.f', 'address.zip': '75002', 'rows.1.amount': 3}
+        assert list(form.changes()) == ['email', 'address.zip', 'rows.1.amount']
+
+    def test_rows_resized(self):
+        form = self.OrderForm(self.model(), {
+            'email': 'a@b.c', 'address': {'city': 'Paris', 'zip': '75001'}, 'rows': [{'title': 'x', 'amount': '1'}],
+        }, submit=True)
+        assert form.changes() == {'rows': [{'title': 'x', 'amount': 1}]}
+
+    def test_cleared(self):
+        form = self.OrderForm(self.model(), {'address': {'city': 'Paris', 'zip': '75001'}, 'rows': []}, submit=True)
+        assert form.changes() == {'email': None, 'rows': []}
+
+
 class Test_ChoiceField:
     def test_valid(self):
         field = ChoiceField(
@@ -0,0 +1,143 @@
+from werkzeug.datastructures import MultiDict
+
+from paqforms import helpers
+from paqforms.helpers import *
+
+
+class Test_VariableView:
+    def __init__(self):
+        self.data = MultiDict([
+            ('content', 'post-content'),
+            ('comments-1.content', 'comment-content-1'),
+            ('comments-2.content', 'comment-content-2'),
+            ('tags-2', 'tag-2'),
+            ('tags-1', 'tag-1'),
+            ('choices', 'a'),
+            ('choices', 'b'),
+            ('author.name', 'admin'),
+        ])
+
+    def test_leafs(self):
+        view = VariableView(self.data)
+        assert view['content'] == 'post-content'
+        assert view['choices'] == ['a', 'b']
+        assert view.get('missing') is None
+        assert 'content' in view
+        assert 'missing' not in view
+
+    def test_lists(self):
+        view = VariableView(self.data)
+        assert view['tags'] == ['tag-1', 'tag-2']
+        assert [comment['content'] for comment in view['comments']] == ['comment-content-1', 'comment-content-2']
+
+    def test_nested(self):
+        view = VariableView(self.data)
+        assert view['author']['name'] == 'admin'
+        assert VariableView(self.data, prefix='author')['name'] == 'admin'
+
+    def test_iter(self):
+        view = VariableView(self.data)
+        assert set(view) == {'content', 'comments', 'tags', 'choices', 'author'}
+        assert len(view) == 5
+
+    def test_repetitions(self):
+        view = VariableView(MultiDict([('tags-1', 'tag-1'), ('tags--repetitions', '3')]))
+        assert view['tags'] == ['tag-1', '', '']
+
+    def test_plain_dict(self):
+        view = VariableView({'content': 'post-content', 'tags-1': 'tag-1'})
+        assert view['content'] == 'post-content'
+        assert view['tags'] == ['tag-1']
+
+
+class Document:
+    def __init__(self, **fields):
+        self._fields = fields
+
+
+class Test_Accessors:
+    def test_dict(self):
+        model = {'a': 1}
+        assert xhasattr(model, 'a')
+        assert xgetattr(model, 'a') == 1
+        assert xgetattr(model, 'b', lambda: 2) == 2
+        xsetattr(model, 'b', 3)
+        assert model == {'a': 1, 'b': 3}
+
+    def test_object(self):
+        model = Document()
+        assert not xhasattr(model, 'a')
+        assert xgetattr(model, 'a', 1) == 1
+        xsetattr(model, 'a', 2)
+        assert model.a == 2
+
+    def test_readonly_mapping(self):
+        model = VariableView({'a': '1'})
+        assert xgetattr(model, 'a') == '1'
+        assert get_accessor(VariableView).set is setattr
+
+    def test_register_accessor(self):
+        class SubDocument(Document):
+            pass
+
+        register_accessor(Document,
+            has = lambda model, name: name in model._fields,
+            get = lambda model, name, default: model._fields.get(name, default),
+            set = lambda model, name, value: model._fields.__setitem__(name, value),
+        )
+        try:
+            model = SubDocument(a=1)
+            assert xhasattr(model, 'a')
+            assert xgetattr(model, 'a') == 1
+            xsetattr(model, 'b', 2)
+            assert model._fields == {'a': 1, 'b': 2}
+        finally:
+            helpers.adapters.clear()
+            helpers.accessors.clear()
+
+
+class Test_FormEncode:
+    def test_encode(self):
+        data = {
+            'content': 'post-content',
+            'published': True,
+            'draft': False,
+            'rating': 5,
+            'note': None,
+            'author': Document(),
+            'tags': ['tag-1', 'tag-2'],
+            'comments': [{'content': 'comment-content-1'}],
+        }
+        data['author'].id = 7
+        assert form_encode(data) == {
+            'content': 'post-content',
+            'published': '1',
+            'draft': '0',
+            'rating': '5',
+            'note': '',
+            'author': 7,
+            'tags-0': 'tag-1',
+            'tags-1': 'tag-2',
+            'tags--repetitions': '2',
+            'comments-0.content': 'comment-content-1',
+            'comments--repetitions': '1',
+        }
+        assert form_encode(data, add_repetitions=False) == {
+            key: value for key, value in form_encode(data).items() if not key.endswith('--repetitions')
+        }
+
+    def test_variable_encode_keys(self):
+        data = {'a': {'b': [1, {'c': 2}]}, 'd': [], None: 3}
+        assert set(form_encode(data)) == set(variable_encode(data))
+
+    def test_non_str_keys(self):
+        assert form_encode({'a': {1: 'x'}}) == {'a.1': 'x'}
+        assert form_encode({2: 'y'}) == {'2': 'y'}
+
+    def test_register_value_encoder(self):
+        register_value_encoder(Document, lambda value: 'document')
+        try:
+            assert form_encode({'a': Document()}) == {'a': 'document'}
+        finally:
+            del helpers.value_encoders[Document]
+            helpers.encoders.clear()
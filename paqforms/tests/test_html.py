@@ -18,6 +18,23 @@ class Test_Attr:
         assert '#' in attr
         assert '?' not in attr
 
+
+    def test_oneval(self):
+        assert str(Attr(' a  b\tc ', oneval=True)) == 'a-b-c'
+        assert str(Attr('a - b', oneval=True)) == 'a-b'
+
+
+    def test_slots(self):
+        assert not hasattr(Attr('a'), '__dict__')
+
+
+    def test_cache(self):
+        from paqforms import html
+        html.render_cached_attr.cache_clear()
+        assert str(Attr('secret')) == 'secret'
+        assert str(Attrs(type='password', value='secret', id='pw')) == 'id="pw" type="password" value="secret"'
+        assert html.render_cached_attr.cache_info().currsize == 2 # `id` and `type` only
+
     #def test_sortable(self): --- off now
     #    attr1 = Attr('control-group')
     #    attr1 += 'hidden'
@@ -65,6 +82,13 @@ class Test_Attrs:
         assert str(attrs) == 'x="ok"'
 
 
+    def test_render_matches_attr(self):
+        attrs = Attrs({'class': ' a  b ', 'value': '<"x">', 'x': 7.3, 'y': True, 'z': Attr('z') + 'q'})
+        assert str(attrs) == ' '.join(
+            '{}="{}"'.format(key, attrs[key]) for key in sorted(attrs)
+        )
+
+
     def test_take_prefixed(self):
         attrs_dict = {'class': 'test'}
         attrs_obj = Attrs.take_prefixed(attrs_dict, 'control-group-')
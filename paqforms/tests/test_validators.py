@@ -97,6 +97,49 @@ class Test_LengthValidator:
         validator('xy')
         assert_raises(ValidationError, validator, 'xyz')
 
+class Test_RegexFamily:
+    def __init__(self):
+        self.field = Mock()
+        self.field.translations.gettext = lambda message: message
+
+    def test_compiled(self):
+        validator = RegexValidator(r'^\d+$')
+        assert validator.pattern.pattern == r'^\d+$'
+        validator('123', self.field)
+        assert_raises(ValidationError, validator, '12a', self.field)
+
+    def test_max_length(self):
+        validator = RegexValidator(r'^\d+$', max_length=3)
+        validator('123', self.field)
+        with assert_raises(ValidationError) as context:
+            validator('1234', self.field)
+        assert context.exception.args[0] == 'Length > 3'
+        with assert_raises(ValidationError) as context:
+            EmailValidator(max_length=5)('test@domain.com', self.field)
+        assert context.exception.args[0] == 'Invalid email'
+
+    def test_linear_email(self):
+        valid = ['test@domain', 'test-with-dash@domain.com', 'test+with+plus@domain.com', 'test_under@domain.com', 'тест@домен.рф']
+        invalid = ['', '@domain', 'test@', 'test#hash@domain.com', 'test/slash@domain.com', 'test space@domain.com', 'a@b@c']
+        for validator in [EmailValidator(), EmailValidator(linear=True)]:
+            for value in valid:
+                validator(value, self.field)
+            for value in invalid:
+                assert_raises(ValidationError, validator, value, self.field)
+
+    def test_linear_url(self):
+        valid = ['http://domain.com', 'https://sub.domain.travel:8080/path?q=1', 'ftp://127.0.0.1', 'HTTP://DOMAIN.COM/']
+        invalid = [
+            '', 'domain.com', 'http://', 'http://domain', 'http://domain.c', 'http://domain.com:', 'http://domain.com:80a',
+            'http://1.2.3', 'http://1234.1.1.1', '1http://domain.com', 'http://domain.verylongtld', 'http://a.' * 1000 + '!',
+        ]
+        for validator in [URLValidator(), URLValidator(linear=True)]:
+            for value in valid:
+                validator(value, self.field)
+            for value in invalid:
+                assert_raises(ValidationError, validator, value, self.field)
+
+
 class _Test_ValueValidator:
     def test_call_no_args(self):
         validator = ValueValidator()
@@ -1,7 +1,14 @@
 import re
+import inspect
 import requests
 
 
+# COST CLASSES (validators run cheapest first with `meta={'validation_order': 'cost'}`)
+CHEAP = 10 # Comparisons, lengths
+MODERATE = 20 # Regexes, unknown validators
+EXPENSIVE = 30 # Callbacks (DB lookups, HTTP requests)
+
+
 # HELPERS
 def xgetid(model):
     if isinstance(model, dict):
@@ -17,6 +24,45 @@ def xgetid(model):
             return model.id
 
 
+def is_email_char(char):
+    return char.isalnum() or char in '_-+.'
+
+
+def is_ascii_letters(string):
+    return string.isascii() and string.isalpha()
+
+
+def is_ipv4(host):
+    parts = host.split('.')
+    return len(parts) == 4 and all(1 <= len(part) <= 3 and part.isascii() and part.isdigit() for part in parts)
+
+
+def match_email(value):
+    """Single-pass `EmailValidator` pattern: `local@domain` of word chars, "-", "+" and "." (no newlines)"""
+    local, at, domain = value.partition('@')
+    return bool(local and domain) and all(map(is_email_char, local)) and all(map(is_email_char, domain))
+
+
+def match_url(value):
+    """
+    Single-pass `URLValidator` pattern: `scheme://host[:port][/path]`, host is a name
+    with a 2-10 letters TLD or an IPv4 address (ASCII only, no newlines)
+    """
+    scheme, sep, rest = value.partition('://')
+    if not sep or not is_ascii_letters(scheme) or '\n' in rest:
+        return False
+    authority = rest.partition('/')[0]
+    host, colon, port = authority.partition(':')
+    if colon and not (port.isascii() and port.isdigit()):
+        return False
+    name, dot, tld = host.rpartition('.')
+    return bool(name and dot and 2 <= len(tld) <= 10 and is_ascii_letters(tld)) or is_ipv4(host)
+
+
+def get_cost(validator):
+    return getattr(validator, 'cost', MODERATE)
+
+
 # EXCEPTIONS
 class ValidationError(Exception):
     pass
@@ -27,6 +73,8 @@ class LengthValidator:
     """
     Validates the length of a string or list field.
     """
+    cost = CHEAP
+
     def __init__(self, min=None, max=None, exact=None, min_message=None, max_message=None, minmax_message=None, exact_message=None):
         """
         :param min: minimum length. If not provided, minimum length will not be checked.
@@ -79,6 +127,8 @@ class ValueValidator:
     """
     Validates the value of an integer or float field.
     """
+    cost = CHEAP
+
     def __init__(self, min=None, max=None, exact=None, min_message=None, max_message=None, minmax_message=None, exact_message=None):
         """
         :param min: minimum value. If not provided, minimum value will not be checked.
@@ -128,6 +178,9 @@ class ValueValidator:
 
 
 class OneOfValidator:
+    cost = CHEAP
+
+
     def __init__(self, options, message=None):
         self.options = options # cannot use sets here
         self.message = message
@@ -140,23 +193,42 @@ class OneOfValidator:
 
 
 class RegexValidator:
-    def __init__(self, regex, flags=0, message=None):
+    cost = MODERATE
+
+
+    def __init__(self, regex, flags=0, message=None, max_length=None):
+        """
+        :param max_length: longer input fails before matching (bounds matching time)
+        """
         if not isinstance(regex, str):
             raise TypeError("`regex` must be 'str'")
         self.regex = regex
         self.flags = flags
+        self.pattern = re.compile(regex, flags)
         self.message = message
+        self.max_length = max_length
 
 
     def __call__(self, value, field):
-        if not re.search(self.regex, value, self.flags):
+        if self.max_length is not None and len(value) > self.max_length:
+            message = self.message or field.translations.gettext('Length > {max}').format(max=self.max_length)
+            raise ValidationError(message)
+        if not self.match(value):
             message = self.message or field.translations.gettext('Invalid input')
             raise ValidationError(message)
 
 
+    def match(self, value):
+        return self.pattern.search(value)
+
+
 class EmailValidator(RegexValidator):
-    def __init__(self, message=None):
-        RegexValidator.__init__(self, r'^[-\w+.]+@[-\w+.]+$', re.IGNORECASE, message)
+    def __init__(self, message=None, max_length=None, linear=False):
+        """
+        :param linear: match with `match_email` (linear time, no `re`)
+        """
+        RegexValidator.__init__(self, r'^[-\w+.]+@[-\w+.]+$', re.IGNORECASE, message, max_length)
+        self.linear = linear
 
 
     def __call__(self, value, field):
@@ -170,13 +242,22 @@ class EmailValidator(RegexValidator):
                 raise ValidationError(message)
 
 
+    def match(self, value):
+        return match_email(value) if self.linear else RegexValidator.match(self, value)
+
+
 class URLValidator(RegexValidator):
-    def __init__(self, message=None):
+    def __init__(self, message=None, max_length=None, linear=False):
+        """
+        :param linear: match with `match_url` (linear time, no `re`)
+        """
         RegexValidator.__init__(self,
             r'^[a-z]+://([^/:]+\.[a-z]{2,10}|([0-9]{1,3}\.){3}[0-9]{1,3})(:[0-9]+)?(/.*)?$',
             re.IGNORECASE,
-            message
+            message,
+            max_length
         )
+        self.linear = linear
 
 
     def __call__(self, value, field):
@@ -190,7 +271,14 @@ class URLValidator(RegexValidator):
                 raise ValidationError(message)
 
 
+    def match(self, value):
+        return match_url(value) if self.linear else RegexValidator.match(self, value)
+
+
 class RepeatValidator:
+    cost = CHEAP
+
+
     def __init__(self, fieldname, message=None):
         self.fieldname = fieldname
         self.message = message
@@ -210,26 +298,40 @@ class RepeatValidator:
 
 
 class CallbackValidator:
-    def __init__(self, callback, message=None):
+    def __init__(self, callback, message=None, cost=EXPENSIVE):
         """
-        :param callback: func(value, field) => bool
+        :param callback: func(value, field) => bool (or awaitable bool, see `feed_async`)
+        :param cost: cost class, pass `CHEAP` for callbacks that do no I/O
         """
         self.callback = callback
         self.message = message
+        self.cost = cost
 
 
     def __call__(self, value, field):
         result = self.callback(value, field)
+        if inspect.isawaitable(result):
+            return self.check_async(result)
         if not result:
             raise ValidationError(self.message)
 
 
+    async def check_async(self, result):
+        if not await result:
+            raise ValidationError(self.message)
+
+
 class MapValidator:
     def __init__(self, validator, message=None):
         self.validator = validator
         self.message = message
 
 
+    @property
+    def cost(self):
+        return get_cost(self.validator)
+
+
     def __call__(self, value, field):
         try:
             [self.validator(v, field) for v in value]
@@ -239,12 +341,50 @@ class MapValidator:
             raise ValidationError(message)
 
 
+class CrossValidator:
+    """
+    Form-level check of several fields, listed in `BaseForm.cross_validators`.
+    Runs once after the form fed its fields and is skipped while any of them has an error
+    """
+    def __init__(self, fields, callback, message=None, target=None):
+        """
+        :param fields: paths of the input fields ('password', 'address.zip', 'rows.0.amount')
+        :param callback: func(*values) => bool (or awaitable bool, see `feed_async`)
+        :param target: path of the field the error goes to, the form itself by default.
+            Validators reading that field run after this one
+        """
+        self.fields = (fields,) if isinstance(fields, str) else tuple(fields)
+        self.callback = callback
+        self.message = message
+        self.target = target
+
+
+    def __repr__(self):
+        return '<CrossValidator: fields={!r}, target={!r}>'.format(self.fields, self.target)
+
+
+    def __call__(self, values, form):
+        result = self.callback(*values)
+        if inspect.isawaitable(result):
+            return self.check_async(result, form)
+        if not result:
+            raise ValidationError(self.message or form.translations.gettext('Invalid value'))
+
+
+    async def check_async(self, result, form):
+        if not await result:
+            raise ValidationError(self.message or form.translations.gettext('Invalid value'))
+
+
 __all__ = (
     # EXCEPTIONS
     'ValidationError',
 
+    # COST CLASSES
+    'CHEAP', 'MODERATE', 'EXPENSIVE',
+
     # VALIDATORS
     'LengthValidator', 'ValueValidator', 'OneOfValidator',
     'RegexValidator', 'EmailValidator', 'URLValidator',
-    'RepeatValidator', 'CallbackValidator', 'MapValidator',
+    'RepeatValidator', 'CallbackValidator', 'MapValidator', 'CrossValidator',
 )
\ No newline at end of file